@@ -1,17 +1,39 @@
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import pandas as pd
 from datetime import datetime, timedelta
 import os
 import pytz
-from utils import validation, storage
+from utils import validation, storage, analytics, email_outbox, http_endpoints, reminders, rate_limit, idempotency, async_db, media, upload_gate, models, session_memory, archive, profiler, shared_state, warmup
 import uuid
 import re
-from supabase import create_client, Client
+import asyncio
+import dataclasses
 
-# Initialize Supabase client
-supabase_url = os.environ.get("SUPABASE_URL")
-supabase_key = os.environ.get("SUPABASE_KEY")
-supabase: Client = create_client(supabase_url, supabase_key)
+# Queue a confirmation email for every new appointment (no-op unless SMTP is configured)
+storage.add_change_listener(email_outbox.enqueue_confirmation)
+
+# Send reminder emails ahead of upcoming appointments (only when email is configured)
+def load_reminder_rows():
+    """Load upcoming appointments for the reminder scheduler."""
+    success, rows = storage.get_upcoming_appointments(columns=','.join(reminders.REMINDER_FIELDS))
+    if not success:
+        raise Exception(rows)
+    return rows
+
+if email_outbox.get_outbox() is not None:
+    # Only the process holding the reminder lease sends them, so it must also see the other processes' changes
+    reminders.start_scheduler(load_reminder_rows, email_outbox.enqueue_reminder)
+    storage.add_change_listener(reminders.apply_change, remote=True)
+
+# Serve the calendar feed and readiness probe from a side server (started once per process)
+http_endpoints.start_server()
+
+# Prime connections and caches in the background (no-op if serve.py already started it)
+warmup.start()
+
+# Move old appointments to the Parquet archive (only when ARCHIVE_AFTER_DAYS is set)
+archive.start_archiver()
 
 # Page configuration
 st.set_page_config(
@@ -21,9 +43,29 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
+def profiling_requested():
+    """Return True if this session asked for rerun profiling with ?profile=1."""
+    return st.query_params.get("profile") == "1"
+
+# Time the sections of this rerun when profiling is on (PROFILE_RERUNS=true or ?profile=1)
+profiler.begin_rerun(profiling_requested())
+
 # Constants
 MAX_FILE_SIZE_MB = 20
 MAX_FILE_SIZE_BYTES = MAX_FILE_SIZE_MB * 1024 * 1024  # Convert MB to bytes
+# Extensions accepted by the document and thirst trap uploaders
+DOCUMENT_FILE_TYPES = ["jpg", "jpeg", "png", "pdf", "doc", "docx", "csv", "xls", "xlsx", "ppt", "pptx", "txt", "md"]
+THIRST_TRAP_FILE_TYPES = ["jpg", "jpeg", "png", "gif", "mp4"]
+SEARCH_PAGE_SIZE = 20  # Results per page in the admin search
+# Proxies in front of the app that append to X-Forwarded-For (0 when clients connect directly)
+TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", "0"))
+
+# Bulk actions on the admin dashboard, mapped to the status they set
+BULK_ACTIONS = {
+    "✅ Accept": "accepted",
+    "❌ Reject": "rejected",
+    "🚫 Cancel": "cancelled"
+}
 
 # Define appointment types
 APPOINTMENT_TYPES = [
@@ -39,8 +81,30 @@ def get_local_date():
     # This ensures we're using the user's local timezone
     return datetime.now().date()  # Fallback for initial load
 
+def get_client_ip():
+    """Return the client's IP address as seen by the trusted proxies, or the connection's address, if available."""
+    context = getattr(st, "context", None)
+    headers = getattr(context, "headers", None) or {}
+    forwarded_for = [address.strip() for address in (headers.get("X-Forwarded-For") or "").split(",") if address.strip()]
+    if TRUSTED_PROXY_HOPS and len(forwarded_for) >= TRUSTED_PROXY_HOPS:
+        # Clients can put anything in front; only the entries our own proxies appended can be trusted,
+        # and the first of those is the address that connected to the outermost proxy
+        return forwarded_for[-TRUSTED_PROXY_HOPS]
+    return getattr(context, "ip_address", None)
+
+def record_session_memory():
+    """Record this session's state size in the process-wide registry shown on the admin page."""
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        return
+    try:
+        session_memory.record_session(ctx.session_id, st.session_state)
+    except Exception as e:
+        print(f"Error measuring session state: {e}")
+
 # Enhanced CSS for better styling
-st.markdown("""
+with profiler.section("css"):
+    st.markdown("""
 <style>
     /* Import Google Fonts - Poppins is a stylish yet minimalistic font */
     @import url('https://fonts.googleapis.com/css2?family=Poppins:wght@300;400;500;600;700&display=swap');
@@ -210,14 +274,16 @@ st.markdown("""
         }
     }
 </style>
-""", unsafe_allow_html=True)
+    """, unsafe_allow_html=True)
 
 def main():
     # Initialize storage and test database connection
-    storage.initialize_storage()
+    with profiler.section("initialize_storage"):
+        storage.initialize_storage()
     
     # Test database connection
-    db_connection_success, db_message = storage.check_database_connection()
+    with profiler.section("health_check"):
+        db_connection_success, db_message = storage.check_database_connection()
     if not db_connection_success:
         st.error(f"⚠️ Database Connection Error: {db_message}")
         st.warning("The application will continue to run, but appointments can't be saved to the database!")
@@ -233,7 +299,30 @@ def main():
     if 'appointment_submitted' in st.session_state and st.session_state.appointment_submitted:
         show_confirmation()
     else:
-        show_appointment_form()
+        with profiler.section("appointment_form"):
+            show_appointment_form()
+
+def form_key(field):
+    """Return the widget key of a booking form field; keys change with the form key so a new form starts empty."""
+    return f"{field}_{st.session_state.form_key}"
+
+def form_value(field, default=None):
+    """Return the current value of a booking form field."""
+    return st.session_state.get(form_key(field), default)
+
+def check_form_upload(file_object, allowed_extensions):
+    """Gate an uploaded file on size and sniffed type; return (file or None, content type, error or None)."""
+    if file_object is None or not hasattr(file_object, 'type'):
+        return None, None, None
+    is_valid, upload_error, content_type = upload_gate.check_upload(file_object, allowed_extensions, MAX_FILE_SIZE_BYTES)
+    if not is_valid:
+        return None, None, upload_error
+    return file_object, content_type, None
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def preview_image(file_id, _file_object):
+    """Return a downscaled preview of an uploaded image, computed once per upload, or None if it can't be decoded."""
+    return media.preview(_file_object.getvalue())
 
 def show_appointment_form():
     """Display the appointment booking form."""
@@ -242,118 +331,92 @@ def show_appointment_form():
     if 'thirst_trap' not in st.session_state:
         st.session_state.thirst_trap = False
     
-    # Create the form
-    with st.form(key=f'appointment_form_{st.session_state.form_key}'):
-        # Personal Information Section with custom styling
-        # st.markdown('<div class="form-section">', unsafe_allow_html=True)
-        st.markdown('<p class="subheader">👤 Your Information</p>', unsafe_allow_html=True)
+    # The uploads and the intern section are fragments, so their previews and the
+    # thirst trap uploader update by rerunning only that section
+    show_document_upload()
+    show_intern_section()
+    
+    # Text fields stay in a form: editing them reruns nothing until the booking is submitted
+    show_details_form()
+
+def show_details_form():
+    """Display the personal information, appointment details and free-text fields, and book on submit."""
+    with st.form(key=form_key("details_form")):
+        with profiler.section("details_form"):
+            # Personal Information Section with custom styling
+            st.markdown('<p class="subheader">👤 Your Information</p>', unsafe_allow_html=True)
         
-        # Personal information
-        name = st.text_input("Name*")
-        col1, col2 = st.columns(2)
-        with col1:
-            email = st.text_input("Email Address*")
-        with col2:
-            phone = st.text_input("Phone Number*")
-        st.markdown('</div>', unsafe_allow_html=True)
+            # Personal information
+            st.text_input("Name*", key=form_key("name"))
+            col1, col2 = st.columns(2)
+            with col1:
+                st.text_input("Email Address*", key=form_key("email"))
+            with col2:
+                st.text_input("Phone Number*", key=form_key("phone"))
         
-        # Appointment Details Section
-        # st.markdown('<div class="form-section">', unsafe_allow_html=True)
-        st.markdown('<p class="subheader">📅 Appointment Details</p>', unsafe_allow_html=True)
+            # Appointment Details Section
+            st.markdown('<p class="subheader">📅 Appointment Details</p>', unsafe_allow_html=True)
         
-        # Appointment type
-        appointment_type = st.selectbox(
-            "Appointment Type*",
-            options=["Select an appointment type"] + APPOINTMENT_TYPES
-        )
+            # Appointment type
+            st.selectbox(
+                "Appointment Type*",
+                options=["Select an appointment type"] + APPOINTMENT_TYPES,
+                key=form_key("appointment_type")
+            )
         
-        # Intern checkbox and conditional message
-        col1, col2 = st.columns([3, 1])
-        with col2:
-            is_intern = st.checkbox("Are you an intern?")
-            
-        # Show message if intern is checked
-        if is_intern:
-            st.markdown("""
-            <div style="background-color: #FF5A5F; color: white; padding: 20px; border-radius: 10px; margin: 10px 0; animation: pulse 1.5s infinite;">
-                <h3 style="margin-top: 0; color: white;">🔥 Intern Application Notice 🔥</h3>
-                <p style="font-size: 16px; margin-bottom: 0;">You must submit a thirst trap as part of the application process.</p>
-            </div>
-            <style>
-                @keyframes pulse {
-                    0% { opacity: 0.8; }
-                    50% { opacity: 1; }
-                    100% { opacity: 0.8; }
-                }
-            </style>
-            """, unsafe_allow_html=True)
+            # Date and time selection
+            col1, col2 = st.columns(2)
+            with col1:
+                # Set min date to tomorrow and max date to 1 months from now
+                min_date = get_local_date()
+                max_date = min_date + timedelta(days=30)
+                st.date_input(
+                    "Preferred Date*",
+                    min_value=min_date,
+                    max_value=max_date,
+                    value=min_date,
+                    key=form_key("appointment_date")
+                )
         
-        # Date and time selection
-        col1, col2 = st.columns(2)
-        with col1:
-            # Set min date to tomorrow and max date to 1 months from now
-            min_date = get_local_date()
-            max_date = min_date + timedelta(days=30)
-            appointment_date = st.date_input(
-                "Preferred Date*",
-                min_value=min_date,
-                max_value=max_date,
-                value=min_date
-            )
+            with col2:
+                st.selectbox(
+                    "Preferred Time*",
+                    options=[
+                        "10:00", "11:00", "12:00", "13:00", "14:00", "15:00", "16:00", "17:00",
+                        "18:00", "19:00", "20:00", "21:00", "22:00"
+                    ],
+                    key=form_key("appointment_time")
+                )
         
-        with col2:
-            appointment_time = st.selectbox(
-                "Preferred Time*",
-                options=[
-                    "10:00", "11:00", "12:00", "13:00", "14:00", "15:00", "16:00", "17:00",
-                    "18:00", "19:00", "20:00", "21:00", "22:00"
-                ]
-            )
-        st.markdown('</div>', unsafe_allow_html=True)
+            # Additional Information Section
+            st.markdown('<p class="subheader">📝 Additional Information</p>', unsafe_allow_html=True)
         
-        # Additional Information Section
-        # st.markdown('<div class="form-section">', unsafe_allow_html=True)
-        st.markdown('<p class="subheader">📝 Additional Information</p>', unsafe_allow_html=True)
+            # Reason for appointment (using text_area which supports height)
+            st.text_area("Reason for the appointment*", height=100, key=form_key("reason"))
         
-        # Reason for appointment (using text_area which supports height)
-        reason = st.text_area("Reason for the appointment*", height=100)
+            # Additional notes
+            st.text_area("Additional Notes (optional)", height=100, key=form_key("notes"))
         
+        # Submit button with enhanced styling; submitting reruns the whole app
+        submitted = st.form_submit_button("📋 Book Appointment", use_container_width=True, type="primary")
+    if submitted:
+        submit_appointment()
+
+@st.fragment
+def show_document_upload():
+    """Display the document uploader and a preview of the uploaded file."""
+    with profiler.fragment("document_upload", profiling_requested()):
         # File upload functionality
         st.markdown(f"<label>Upload any documents (optional, max {MAX_FILE_SIZE_MB}MB)</label>", unsafe_allow_html=True)
         uploaded_file = st.file_uploader("Upload Documents", 
-                                         type=["jpg", "jpeg", "png", "pdf", "doc", "docx", "csv", "xls", "xlsx", "ppt", "pptx", "txt", "md"],
+                                         type=DOCUMENT_FILE_TYPES,
+                                         key=form_key("uploaded_file"),
                                          label_visibility="collapsed")
         
-        # Special file upload for interns
-        thirst_trap_file = None
-        if is_intern:
-            st.markdown("""
-            <div style="margin-top: 20px; margin-bottom: 10px;">
-                <label style="font-weight: 500; color: #FF5A5F;">
-                    🔥 Upload Thirst Trap for Intern Application* 🔥
-                </label>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            # Use a different key to avoid collision with session state variable
-            thirst_trap_file = st.file_uploader("Thirst Trap Upload", 
-                                               type=["jpg", "jpeg", "png", "gif", "mp4"],
-                                               key="thirst_trap_file",
-                                               label_visibility="collapsed")
-            
-            # Check if file is properly uploaded (not None and not a boolean)
-            if thirst_trap_file is not None and hasattr(thirst_trap_file, 'type'):
-                if thirst_trap_file.type.startswith('image'):
-                    st.image(thirst_trap_file, caption="Your thirst trap has been received 🔥", use_column_width=True)
-                elif thirst_trap_file.type.startswith('video'):
-                    st.video(thirst_trap_file)
-                st.success("Thirst trap successfully uploaded! Your application will be prioritized ;)")
-                # Track that a thirst trap has been uploaded in session state
-                st.session_state.thirst_trap = True
-            else:
-                # Only reset if we're not using a previously uploaded thirst trap
-                if 'thirst_trap' in st.session_state and not st.session_state.thirst_trap:
-                    st.session_state.thirst_trap = False
+        # Check size and real content type before anything previews or reads the whole file
+        uploaded_file, uploaded_file_type, upload_error = check_form_upload(uploaded_file, DOCUMENT_FILE_TYPES)
+        if upload_error:
+            st.error(f"⚠️ {upload_error}")
         
         # Show uploaded file if available
         if uploaded_file is not None:
@@ -361,140 +424,214 @@ def show_appointment_form():
             # Get file details
             file_details = {
                 "Filename": uploaded_file.name,
-                "FileType": uploaded_file.type,
+                "FileType": uploaded_file_type,
                 "FileSize": f"{uploaded_file.size / 1024:.2f} KB"
             }
             st.markdown("#### File Details")
             st.json(file_details)
             
             # Display the file based on its type
-            if uploaded_file.type.startswith('image'):
-                st.image(uploaded_file, use_column_width=True)
-            elif uploaded_file.type.startswith('application/pdf'):
-                st.markdown("✅ **PDF file uploaded successfully**")
-            else:
-                st.markdown("✅ **File uploaded successfully**")
+            with profiler.section("file_previews"):
+                preview = preview_image(uploaded_file.file_id, uploaded_file) if uploaded_file_type.startswith('image') else None
+                if preview is not None:
+                    st.image(preview, use_column_width=True)
+                elif uploaded_file_type.startswith('image'):
+                    st.markdown("✅ **Image uploaded** (no preview available)")
+                elif uploaded_file_type.startswith('application/pdf'):
+                    st.markdown("✅ **PDF file uploaded successfully**")
+                else:
+                    st.markdown("✅ **File uploaded successfully**")
             st.markdown('</div>', unsafe_allow_html=True)
+
+@st.fragment
+def show_intern_section():
+    """Display the intern checkbox and, for interns, the thirst trap uploader and preview."""
+    with profiler.fragment("intern_section", profiling_requested()):
+        # Intern checkbox and conditional message
+        is_intern = st.checkbox("Are you an intern?", key=form_key("is_intern"))
+        if not is_intern:
+            return
         
-        # Additional notes
-        notes = st.text_area("Additional Notes (optional)", height=100)
-        st.markdown('</div>', unsafe_allow_html=True)
+        st.markdown("""
+        <div style="background-color: #FF5A5F; color: white; padding: 20px; border-radius: 10px; margin: 10px 0; animation: pulse 1.5s infinite;">
+            <h3 style="margin-top: 0; color: white;">🔥 Intern Application Notice 🔥</h3>
+            <p style="font-size: 16px; margin-bottom: 0;">You must submit a thirst trap as part of the application process.</p>
+        </div>
+        <style>
+            @keyframes pulse {
+                0% { opacity: 0.8; }
+                50% { opacity: 1; }
+                100% { opacity: 0.8; }
+            }
+        </style>
+        """, unsafe_allow_html=True)
+        
+        st.markdown("""
+        <div style="margin-top: 20px; margin-bottom: 10px;">
+            <label style="font-weight: 500; color: #FF5A5F;">
+                🔥 Upload Thirst Trap for Intern Application* 🔥
+            </label>
+        </div>
+        """, unsafe_allow_html=True)
         
-        # Submit button with enhanced styling
-        submit_button = st.form_submit_button("📋 Book Appointment", use_container_width=True, type="primary")
+        # Use a different key to avoid collision with session state variable
+        thirst_trap_file = st.file_uploader("Thirst Trap Upload", 
+                                           type=THIRST_TRAP_FILE_TYPES,
+                                           key=form_key("thirst_trap_file"),
+                                           label_visibility="collapsed")
         
-        if submit_button:
-            # Check file size if a file was uploaded
-            file_too_large = False
-            if uploaded_file is not None and uploaded_file.size > MAX_FILE_SIZE_BYTES:
-                st.error(f"⚠️ File size exceeds the maximum limit of {MAX_FILE_SIZE_MB}MB. Please upload a smaller file.")
-                file_too_large = True
-            
-            errors = validate_form(name, email, phone, appointment_type, appointment_date, appointment_time, reason)
+        thirst_trap_file, thirst_trap_type, upload_error = check_form_upload(thirst_trap_file, THIRST_TRAP_FILE_TYPES)
+        if upload_error:
+            st.error(f"⚠️ {upload_error}")
+        
+        # Check if file is properly uploaded (not None and not a boolean)
+        if thirst_trap_file is not None:
+            with profiler.section("file_previews"):
+                preview = preview_image(thirst_trap_file.file_id, thirst_trap_file) if thirst_trap_type.startswith('image') else None
+                if preview is not None:
+                    st.image(preview, caption="Your thirst trap has been received 🔥", use_column_width=True)
+                elif thirst_trap_type.startswith('image'):
+                    st.markdown("🔥 **Thirst trap received** (no preview available)")
+                elif thirst_trap_type.startswith('video'):
+                    st.video(thirst_trap_file)
+            st.success("Thirst trap successfully uploaded! Your application will be prioritized ;)")
+            # Track that a thirst trap has been uploaded in session state
+            st.session_state.thirst_trap = True
+
+def submit_appointment():
+    """Validate the booking form, save the appointment and its files, and show the confirmation."""
+    name = form_value("name", "")
+    email = form_value("email", "")
+    phone = form_value("phone", "")
+    appointment_type = form_value("appointment_type")
+    appointment_date = form_value("appointment_date")
+    appointment_time = form_value("appointment_time")
+    reason = form_value("reason", "")
+    notes = form_value("notes", "")
+    is_intern = form_value("is_intern", False)
+    
+    # Rejected uploads were already reported next to their uploader
+    uploaded_file, uploaded_file_type, document_error = check_form_upload(form_value("uploaded_file"), DOCUMENT_FILE_TYPES)
+    thirst_trap_file, thirst_trap_type, thirst_trap_error = (None, None, None)
+    if is_intern:
+        thirst_trap_file, thirst_trap_type, thirst_trap_error = check_form_upload(form_value("thirst_trap_file"), THIRST_TRAP_FILE_TYPES)
+    upload_errors = [error for error in (document_error, thirst_trap_error) if error]
+    
+    errors = validate_form(name, email, phone, appointment_type, appointment_date, appointment_time, reason)
+    
+    if errors or upload_errors:
+        for error in errors:
+            st.error(f"⚠️ {error}")
+        return
+    
+    # Check if intern has submitted a thirst trap
+    if is_intern:
+        if thirst_trap_file is None and not st.session_state.thirst_trap:
+            st.error("⚠️ Interns must upload a thirst trap!")
+            return
+    
+    # Debug info about the files that will be uploaded
+    has_thirst_trap_file = is_intern and thirst_trap_file is not None
+    if uploaded_file is not None:
+        st.toast(f"File ready for upload: {uploaded_file.name}")
+    if has_thirst_trap_file:
+        st.toast(f"Thirst trap ready for upload: {thirst_trap_file.name}")
+    elif is_intern and st.session_state.thirst_trap:
+        # No file is currently in the uploader but we previously tracked a successful upload
+        st.toast("Using previously uploaded thirst trap")
+    
+    # Prepare appointment data
+    appointment = models.Appointment(
+        name=name,
+        email=email,
+        phone=phone,
+        appointment_type=appointment_type,
+        appointment_date=appointment_date.strftime('%Y-%m-%d'),
+        appointment_time=appointment_time,
+        reason=reason,
+        notes=notes,
+        is_intern=is_intern,
+        file_uploaded=uploaded_file is not None,
+        thirst_trap_uploaded=has_thirst_trap_file or (is_intern and st.session_state.thirst_trap)
+    )
+    
+    # A double click, a rerun during a slow upload or a retry resubmits the same data;
+    # reuse the appointment created the first time instead of inserting and uploading again
+    idempotency_key = idempotency.submission_key(
+        st.session_state.form_key,
+        models.to_row(appointment),
+        (uploaded_file, thirst_trap_file)
+    )
+    # Claim the key before looking it up, so a second submit arriving while the first is
+    # still saving or uploading files waits for it instead of uploading the files again
+    claim = idempotency.claim(idempotency_key)
+    if claim is None:
+        st.info("⏳ This booking is already being submitted. Please wait a moment.")
+        return
+    try:
+        existing_id = idempotency.lookup(idempotency_key, storage.get_appointment_id_by_idempotency_key)
+        if existing_id is not None:
+            appointment_id, created = existing_id, False
+        else:
+            # Only valid, new bookings count against the limits; floods are still rejected before anything is stored
+            allowed, limited_by = rate_limit.check_submission(email, phone, get_client_ip())
+            if not allowed:
+                st.error(f"⚠️ Too many booking attempts from this {limited_by}. Please try again later.")
+                return
             
-            if errors or file_too_large:
-                for error in errors:
-                    st.error(f"⚠️ {error}")
-            else:
-                # Prepare appointment data
-                appointment_data = {
-                    'name': name,
-                    'email': email,
-                    'phone': phone,
-                    'appointment_type': appointment_type,
-                    'appointment_date': appointment_date.strftime('%Y-%m-%d'),
-                    'appointment_time': appointment_time,
-                    'reason': reason,
-                    'notes': notes,
-                    'is_intern': is_intern
-                }
-                
-                # Check if intern has submitted a thirst trap
-                if is_intern:
-                    if (thirst_trap_file is None or not hasattr(thirst_trap_file, 'type')) and not st.session_state.thirst_trap:
-                        st.error("⚠️ Interns must upload a thirst trap!")
-                        return
-                
-                # Handle file upload if exists
-                if uploaded_file is not None:
-                    # Add file info to appointment data
-                    appointment_data['file_uploaded'] = True
-                    # Pass the actual file object
-                    appointment_data['uploaded_file'] = uploaded_file
-                    # Debug info
-                    st.toast(f"File ready for upload: {uploaded_file.name}")
-                else:
-                    appointment_data['file_uploaded'] = False
-                
-                # Handle thirst trap upload for interns
-                if is_intern:
-                    if thirst_trap_file is not None and hasattr(thirst_trap_file, 'type'):
-                        # Add thirst trap info to appointment data
-                        appointment_data['thirst_trap_uploaded'] = True
-                        # Pass the actual file object
-                        appointment_data['thirst_trap_file'] = thirst_trap_file
-                        # Debug info
-                        st.toast(f"Thirst trap ready for upload: {thirst_trap_file.name}")
-                    else:
-                        # If no file is currently in the uploader but we previously tracked a successful upload
-                        if st.session_state.thirst_trap:
-                            appointment_data['thirst_trap_uploaded'] = True
-                            st.toast("Using previously uploaded thirst trap")
-                        else:
-                            appointment_data['thirst_trap_uploaded'] = False
-                
-                # Save the appointment to Supabase
-                appointment_id = save_appointment(appointment_data)
-                
-                if appointment_id:
-                    # Handle file upload after appointment is created
-                    if appointment_data.get('file_uploaded'):
-                        try:
-                            file_url = save_file_to_supabase(
-                                uploaded_file, 
-                                file_prefix=f"appointment_{appointment_id}_", 
-                                is_thirst_trap=False
-                            )
-                            st.toast(f"File uploaded successfully: {file_url}")
-                            
-                            # Update appointment with file URL
-                            update_appointment_file(appointment_id, file_url)
-                        except Exception as e:
-                            st.error(f"Error uploading file: {str(e)}")
-                    
-                    # Handle thirst trap upload for interns AFTER appointment is created
-                    if is_intern and appointment_data.get('thirst_trap_uploaded'):
-                        try:
-                            # Only try to upload if we have a file object (might be using previous upload)
-                            if 'thirst_trap_file' in appointment_data:
-                                thirst_trap_url = save_file_to_supabase(
-                                    appointment_data['thirst_trap_file'], 
-                                    file_prefix=f"thirst_trap_{appointment_id}_", 
-                                    is_thirst_trap=True
-                                )
-                                st.toast(f"Thirst trap uploaded successfully: {thirst_trap_url}")
-                                
-                                # Update appointment with thirst trap URL
-                                update_appointment_thirst_trap(appointment_id, thirst_trap_url)
-                        except Exception as e:
-                            st.error(f"Error uploading thirst trap: {str(e)}")
-                    
-                    # Show success message and generate a new form key for the next form
-                    st.success(f"✅ Appointment booked successfully! Your appointment ID is {appointment_id}.")
-                    st.balloons()
-                    
-                    # Generate a new form key for the next submission
-                    st.session_state.form_key = str(uuid.uuid4())
-                    
-                    # Store appointment data in session state
-                    st.session_state.appointment_submitted = True
-                    st.session_state.appointment_data = appointment_data
-                    st.session_state.appointment_id = appointment_id
-                    
-                    # Rerun to show a fresh form or the confirmation page
-                    st.rerun()
-                else:
-                    st.error("Failed to book appointment. Please try again.")
+            # Save the appointment to Supabase
+            appointment = dataclasses.replace(appointment, idempotency_key=idempotency_key)
+            appointment_id, created = save_appointment(appointment)
+        
+        if appointment_id:
+            # Upload the document and the thirst trap concurrently after the appointment is created
+            uploads = {}
+            if uploaded_file is not None:
+                uploads['file_url'] = (uploaded_file, f"appointment_{appointment_id}_", False, uploaded_file_type)
+            # Only upload a thirst trap if we have a file object (might be using previous upload)
+            if has_thirst_trap_file:
+                uploads['thirst_trap_url'] = (thirst_trap_file, f"thirst_trap_{appointment_id}_", True, thirst_trap_type)
+            if uploads and not created:
+                # A repeat submit: upload only the files the first attempt didn't get to store,
+                # e.g. because a rerun interrupted it during the upload
+                stored_urls = storage.get_appointment_file_urls(appointment_id)
+                uploads = {column: upload for column, upload in uploads.items() if not stored_urls.get(column)}
+            if uploads:
+                save_appointment_files(appointment_id, uploads)
+            # Only a submission whose files were stored counts as done
+            idempotency.record(idempotency_key, appointment_id)
+    finally:
+        idempotency.release(idempotency_key, claim)
+    
+    if appointment_id:
+        # Show success message and generate a new form key for the next form
+        st.success(f"✅ Appointment booked successfully! Your appointment ID is {appointment_id}.")
+        st.balloons()
+        
+        # Drop the submitted form's widget values, which include the uploaded files
+        previous_form_key = st.session_state.form_key
+        for key in [key for key in st.session_state.keys() if str(key).endswith(f"_{previous_form_key}")]:
+            del st.session_state[key]
+        
+        # Generate a new form key for the next submission
+        st.session_state.form_key = str(uuid.uuid4())
+        
+        # Keep only what the confirmation page shows, not the form data and file objects
+        st.session_state.appointment_submitted = True
+        st.session_state.confirmation = models.ConfirmationRecord(
+            appointment_id=appointment_id,
+            name=name,
+            appointment_date=appointment.appointment_date,
+            appointment_time=appointment.appointment_time,
+            appointment_type=appointment.appointment_type,
+            file_name=uploaded_file.name if uploaded_file is not None else "",
+            is_intern=is_intern,
+            thirst_trap_uploaded=appointment.thirst_trap_uploaded
+        )
+        # Rerun to show a fresh form or the confirmation page
+        st.rerun()
+    else:
+        st.error("Failed to book appointment. Please try again.")
 
 def validate_form(name, email, phone, appointment_type, appointment_date, appointment_time, reason):
     """Validate form inputs"""
@@ -531,8 +668,7 @@ def validate_form(name, email, phone, appointment_type, appointment_date, appoin
 
 def show_confirmation():
     """Display confirmation after successful appointment booking."""
-    appointment_data = st.session_state.appointment_data
-    appointment_id = st.session_state.appointment_id
+    confirmation = st.session_state.confirmation
     
     st.markdown(f"""
     <div class='success-message'>
@@ -550,27 +686,26 @@ def show_confirmation():
     
     st.markdown(f"""
         <div style='margin-left: 15px;'>
-            <p><strong>Confirmation Number:</strong> {appointment_id}</p>
-            <p><strong>Name:</strong> {appointment_data['name']}</p>
-            <p><strong>Date:</strong> {appointment_data['appointment_date']}</p>
-            <p><strong>Time:</strong> {appointment_data['appointment_time']}</p>
-            <p><strong>Type:</strong> {appointment_data['appointment_type']}</p>
+            <p><strong>Confirmation Number:</strong> {confirmation.appointment_id}</p>
+            <p><strong>Name:</strong> {confirmation.name}</p>
+            <p><strong>Date:</strong> {confirmation.appointment_date}</p>
+            <p><strong>Time:</strong> {confirmation.appointment_time}</p>
+            <p><strong>Type:</strong> {confirmation.appointment_type}</p>
     """, unsafe_allow_html=True)
     
     # Display file info if a file was uploaded
-    if appointment_data.get('file_uploaded', False):
-        file_name = appointment_data.get('file_name', '')
+    if confirmation.file_name:
         st.markdown(f"""
-            <p><strong>Uploaded Document:</strong> {file_name}</p>
+            <p><strong>Uploaded Document:</strong> {confirmation.file_name}</p>
         """, unsafe_allow_html=True)
     
     # Display intern status and thirst trap info if applicable
-    if appointment_data.get('is_intern', False):
+    if confirmation.is_intern:
         st.markdown(f"""
             <p><strong>Intern Status:</strong> Yes 🔥</p>
         """, unsafe_allow_html=True)
         
-        if appointment_data.get('thirst_trap_uploaded', False):
+        if confirmation.thirst_trap_uploaded:
             st.markdown(f"""
                 <p><strong>Thirst Trap:</strong> Submitted 🔥🫦🔥</p>
                 <p><em>Your application has been prioritized</em></p>
@@ -587,6 +722,7 @@ def show_confirmation():
     if st.button("📋 Book Another Appointment", type="primary"):
         # Reset session state to book a new appointment
         st.session_state.appointment_submitted = False
+        del st.session_state.confirmation
         # Reset form by setting a new form key
         st.session_state.form_key = str(uuid.uuid4())
         # Reset thirst trap flag
@@ -598,8 +734,45 @@ def admin_page():
     """Simple admin view to see all appointments (for future enhancement)."""
     st.markdown("<h1>👩‍💼 Admin Dashboard</h1>", unsafe_allow_html=True)
     
-    # Get all appointments
-    success, result = storage.get_all_appointments()
+    show_statistics()
+    
+    show_search()
+    
+    show_appointment_lookup()
+    
+    show_profile_panel()
+    
+    limit_stats = rate_limit.get_limiter().stats()
+    rejected_by = ", ".join(f"{count} by {kind}" for kind, count in limit_stats['rejected_by'].items())
+    st.caption(f"Rate limiter: {limit_stats['allowed']} submissions allowed, {limit_stats['rejected']} rejected"
+               + (f" ({rejected_by})" if rejected_by else ""))
+
+    outbox = email_outbox.get_outbox()
+    if outbox is not None:
+        email_stats = outbox.stats()
+        st.caption(f"Email outbox: {email_stats['sent']} sent at {email_stats['messages_per_second']:.1f} messages/s, "
+                   f"{email_stats['queued']} queued, {email_stats['failed']} failed, {email_stats['duplicates']} duplicates skipped")
+
+    memory = session_memory.sessions_summary()
+    session_sizes = session_memory.session_state_bytes(st.session_state)
+    largest = ", ".join(f"{key}: {size / 1024:.1f} KB" for key, size in list(session_sizes.items())[:3])
+    st.caption(f"Session state in this process: {memory['total_bytes'] / 1024:.1f} KB across {memory['sessions']} sessions "
+               f"active in the last {session_memory.SESSION_EXPIRY_SECONDS // 60} minutes "
+               f"(largest {memory['largest_bytes'] / 1024:.1f} KB); this session: {sum(session_sizes.values()) / 1024:.1f} KB ({largest})")
+    
+    cache_stats = storage.get_appointment_cache_stats()
+    st.caption(f"Appointment cache: {cache_stats['size']}/{cache_stats['maxsize']} entries, "
+               f"{cache_stats['hit_ratio']:.0%} hit ratio ({cache_stats['hits']} hits, {cache_stats['misses']} misses)")
+    
+    if shared_state.SHARED_STATE_DB_PATH:
+        st.caption(f"Caches and counters shared between processes through {shared_state.SHARED_STATE_DB_PATH}")
+    else:
+        st.caption("Caches and counters are local to this process")
+    
+    # Get all appointments, and the archived history when asked for
+    include_archived = st.checkbox("Include archived appointments", key="admin_include_archived")
+    with profiler.section("admin_data"):
+        success, result = storage.get_all_appointments(include_archived=include_archived)
     
     if success:
         if len(result) > 0:
@@ -630,105 +803,235 @@ def admin_page():
             </style>
             """, unsafe_allow_html=True)
             
-            st.dataframe(result)
+            show_appointments_table(result)
         else:
             st.info("No appointments found.")
     else:
         st.error(f"Error retrieving appointments: {result}")
 
-def save_appointment(appointment_data):
-    """Save appointment data to Supabase and return the appointment ID if successful"""
-    try:
-        # Remove the file objects from the data as they can't be serialized to JSON
-        appointment_json = appointment_data.copy()
-        
-        if "uploaded_file" in appointment_json:
-            del appointment_json["uploaded_file"]
-        
-        if "thirst_trap_file" in appointment_json:
-            del appointment_json["thirst_trap_file"]
+@st.fragment
+def show_appointments_table(appointments):
+    """Display appointments with row selection and a bulk status action bar; selecting rows only reruns this table."""
+    with profiler.fragment("admin_table", profiling_requested()):
+        table = appointments.copy()
+        table.insert(0, "select", False)
+        edited = st.data_editor(
+            table,
+            column_config={
+                "select": st.column_config.CheckboxColumn("Select", default=False),
+                "appointment_date": st.column_config.DateColumn("appointment_date")
+            },
+            disabled=[column for column in table.columns if column != "select"],
+            hide_index=True,
+            key="admin_appointments_table"
+        )
+        selected_ids = [int(appointment_id) for appointment_id in edited.loc[edited["select"], "id"]]
         
+        col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
+        with col1:
+            st.markdown(f"**{len(selected_ids)} selected**")
+        for column, (label, new_status) in zip((col2, col3, col4), BULK_ACTIONS.items()):
+            with column:
+                if st.button(label, disabled=not selected_ids, use_container_width=True):
+                    success, outcomes = storage.update_appointments_status(selected_ids, new_status)
+                    if success:
+                        st.toast(f"Marked {len(outcomes)} appointments as {new_status}.")
+                        # Reload the table and statistics with the new statuses
+                        st.rerun()
+                    else:
+                        failed = {appointment_id: outcome for appointment_id, outcome in outcomes.items() if outcome != "updated"}
+                        st.warning(f"Updated {len(outcomes) - len(failed)} of {len(outcomes)} appointments.")
+                        st.json(failed)
+
+def show_statistics():
+    """Display aggregate appointment counts as charts on the admin dashboard."""
+    success, stats = analytics.get_statistics()
+    if not success:
+        st.error(f"Error computing statistics: {stats}")
+        return
+    
+    st.markdown(f'<p class="subheader">📊 Statistics ({stats["total"]} appointments)</p>', unsafe_allow_html=True)
+    tabs = st.tabs(list(analytics.DIMENSIONS.values()))
+    for tab, dimension in zip(tabs, analytics.DIMENSIONS):
+        with tab:
+            counts = pd.Series(stats[dimension], dtype="int64").sort_index()
+            if counts.empty:
+                st.info("No data yet.")
+            else:
+                counts.index = counts.index.map(str)
+                st.bar_chart(counts)
+
+def show_profile_panel():
+    """Display per-section rerun timings collected by the profiler, if any."""
+    section_stats = profiler.stats()
+    if not section_stats:
+        return
+    
+    with st.expander("⏱️ Rerun Profile"):
+        table = pd.DataFrame.from_dict(section_stats, orient="index")
+        table.index.name = "section"
+        st.dataframe(table.round(1))
+        for timestamp, duration_ms, trace in profiler.slow_traces():
+            st.markdown(f"**Slow rerun at {datetime.fromtimestamp(timestamp):%H:%M:%S}: {duration_ms:.0f} ms**")
+            st.code(trace, language=None)
+        if st.button("Reset profile"):
+            profiler.reset()
+
+def show_appointment_lookup():
+    """Display the full record of one appointment, looked up by ID through the appointment cache."""
+    st.markdown('<p class="subheader">🗂️ Appointment Details</p>', unsafe_allow_html=True)
+    appointment_id = st.number_input("Appointment ID", min_value=0, value=0, step=1, key="admin_lookup_id")
+    if not appointment_id:
+        return
+    
+    success, result = storage.get_appointment_by_id(int(appointment_id))
+    if success:
+        st.json(dataclasses.asdict(result))
+    else:
+        st.warning(f"Appointment {int(appointment_id)}: {result}")
+
+def show_search():
+    """Display a search box over appointments with paged results."""
+    st.markdown('<p class="subheader">🔎 Search Appointments</p>', unsafe_allow_html=True)
+    col1, col2 = st.columns([4, 1])
+    with col1:
+        query = st.text_input("Search by name, email, phone, reason or notes", key="admin_search_query")
+    with col2:
+        page = st.number_input("Page", min_value=1, value=1, step=1, key="admin_search_page")
+    
+    if not query:
+        return
+    
+    success, result = storage.search_appointments(query, page=page, page_size=SEARCH_PAGE_SIZE)
+    if not success:
+        st.error(f"Error searching appointments: {result}")
+        return
+    
+    total, rows = result
+    if total == 0:
+        st.info("No matching appointments.")
+    else:
+        pages = (total + SEARCH_PAGE_SIZE - 1) // SEARCH_PAGE_SIZE
+        st.caption(f"{total} matches · page {page} of {pages}")
+        st.dataframe(rows)
+
+def save_appointment(appointment):
+    """Save an Appointment to Supabase and return (appointment ID or None, whether this call created it)"""
+    try:
         # Insert appointment into the database
-        response = supabase.table("appointments").insert(appointment_json).execute()
+        try:
+            rows = async_db.run(async_db.insert_row("appointments", appointment))
+        except Exception as e:
+            # The unique idempotency_key column rejects a concurrent duplicate submit
+            if appointment.idempotency_key and ("23505" in str(e) or "duplicate key" in str(e)):
+                return storage.get_appointment_id_by_idempotency_key(appointment.idempotency_key), False
+            # A database without the idempotency column still takes bookings, just without the guarantee
+            if appointment.idempotency_key and storage.is_missing_idempotency_column(e):
+                print(storage.IDEMPOTENCY_COLUMN_MISSING)
+                return save_appointment(dataclasses.replace(appointment, idempotency_key=None))
+            raise
         
-        if response.data and len(response.data) > 0:
-            return response.data[0]["id"]
+        if rows:
+            storage.notify_change("insert", rows[0])
+            return rows[0]["id"], True
         else:
             st.error(f"Error saving appointment: No ID returned")
-            return None
+            return None, False
     except Exception as e:
         st.error(f"Exception during appointment save: {str(e)}")
-        return None
+        return None, False
 
-def save_file_to_supabase(file_object, file_prefix="", is_thirst_trap=False):
-    """Save a file to Supabase storage and return the URL"""
-    try:
-        # Determine bucket based on file type
-        bucket = "thirst-traps" if is_thirst_trap else "appointment-files"
-        
-        # Create a unique file name
-        file_extension = os.path.splitext(file_object.name)[1]
-        unique_filename = f"{file_prefix}{uuid.uuid4()}{file_extension}"
-        
-        # Upload file to Supabase
-        st.toast(f"Uploading {file_object.name} to {bucket}...")
+async def upload_file_async(file_object, file_prefix="", is_thirst_trap=False, content_type=None):
+    """Compress (if enabled) and upload a file to Supabase storage, returning the URL and the bytes saved"""
+    # Determine bucket based on file type
+    bucket = "thirst-traps" if is_thirst_trap else "appointment-files"
+    
+    # Prefer the sniffed content type over the one reported by the browser
+    content, file_name, content_type, bytes_saved = await media.compress_async(
+        file_object.getvalue(), file_object.name, content_type or file_object.type
+    )
+    
+    # Create a unique file name
+    file_extension = os.path.splitext(file_name)[1]
+    unique_filename = f"{file_prefix}{uuid.uuid4()}{file_extension}"
+    
+    file_url = await async_db.upload_file(bucket, unique_filename, content, content_type)
+    return file_url, bytes_saved
+
+def save_appointment_files(appointment_id, uploads):
+    """
+    Upload an appointment's files concurrently and store their URLs with a single update.
+    
+    Args:
+        appointment_id: ID of the appointment the files belong to
+        uploads: Dict mapping the URL column to (file_object, file_prefix, is_thirst_trap, content_type)
         
-        response = supabase.storage.from_(bucket).upload(
-            path=unique_filename,
-            file=file_object.getvalue(),
-            file_options={"content-type": file_object.type}
+    Returns:
+        dict: URL column -> URL of every file that was uploaded
+    """
+    async def upload_all():
+        return await asyncio.gather(
+            *(upload_file_async(*upload) for upload in uploads.values()),
+            return_exceptions=True
         )
-        
-        # Get public URL
-        file_url = supabase.storage.from_(bucket).get_public_url(unique_filename)
-        st.success(f"File uploaded successfully")
-        
-        return file_url
-    except Exception as e:
-        st.error(f"Error uploading file: {str(e)}")
-        raise e
-
-def update_appointment_file(appointment_id, file_url):
-    """Update the appointment with the file URL"""
-    try:
-        supabase.table("appointments").update({"file_url": file_url}).eq("id", appointment_id).execute()
-        return True
-    except Exception as e:
-        st.error(f"Error updating appointment with file URL: {str(e)}")
-        return False
+    
+    st.toast(f"Uploading {len(uploads)} file(s)...")
+    results = async_db.run(upload_all())
+    
+    file_urls = {}
+    for (column, (file_object, _, _, _)), result in zip(uploads.items(), results):
+        if isinstance(result, Exception):
+            st.error(f"Error uploading {file_object.name}: {str(result)}")
+        else:
+            file_url, bytes_saved = result
+            file_urls[column] = file_url
+            if bytes_saved:
+                st.toast(f"File uploaded successfully ({bytes_saved / 1024:.0f} KB saved by compression): {file_url}")
+                print(f"Compressed {file_object.name}: {bytes_saved} bytes saved")
+            else:
+                st.toast(f"File uploaded successfully: {file_url}")
+    
+    if file_urls:
+        update_appointment_files(appointment_id, file_urls)
+    return file_urls
 
-def update_appointment_thirst_trap(appointment_id, thirst_trap_url):
-    """Update the appointment with the thirst trap URL"""
+def update_appointment_files(appointment_id, file_urls):
+    """Update the appointment with the URLs of its uploaded files"""
     try:
-        supabase.table("appointments").update({"thirst_trap_url": thirst_trap_url}).eq("id", appointment_id).execute()
+        async_db.run(async_db.update_rows("appointments", file_urls, id=appointment_id))
+        storage.notify_change("update", {"id": appointment_id, **file_urls})
         return True
     except Exception as e:
-        st.error(f"Error updating appointment with thirst trap URL: {str(e)}")
+        st.error(f"Error updating appointment with file URLs: {str(e)}")
         return False
 
 if __name__ == "__main__":
-    # Add a very simple password protection for demo purposes
-    # In a real application, use proper authentication
-    if 'is_admin' not in st.session_state:
-        st.session_state.is_admin = False
-        st.session_state.show_admin_login = False
-    
-    # Simple tab-based navigation instead of URL parameters
-    tab1, tab2 = st.tabs(["Appointment Form", "Admin Login"])
-    
-    with tab1:
-        main()
-    
-    with tab2:
-        st.markdown("<h2>Admin Access</h2>", unsafe_allow_html=True)
-        admin_password = st.text_input("Enter admin password", type="password")
-        if st.button("Login"):
-            if admin_password == "admin123":  # Simple password for demo
-                st.session_state.is_admin = True
-                st.success("Login successful! Redirecting to admin dashboard...")
-                st.rerun()
-            else:
-                st.error("Incorrect password")
+    try:
+        # Add a very simple password protection for demo purposes
+        # In a real application, use proper authentication
+        if 'is_admin' not in st.session_state:
+            st.session_state.is_admin = False
+            st.session_state.show_admin_login = False
+    
+        # Simple tab-based navigation instead of URL parameters
+        tab1, tab2 = st.tabs(["Appointment Form", "Admin Login"])
+    
+        with tab1:
+            main()
+    
+        with tab2:
+            st.markdown("<h2>Admin Access</h2>", unsafe_allow_html=True)
+            admin_password = st.text_input("Enter admin password", type="password")
+            if st.button("Login"):
+                if admin_password == "admin123":  # Simple password for demo
+                    st.session_state.is_admin = True
+                    st.success("Login successful! Redirecting to admin dashboard...")
+                    st.rerun()
+                else:
+                    st.error("Incorrect password")
         
-        if st.session_state.is_admin:
-            admin_page() 
\ No newline at end of file
+            if st.session_state.is_admin:
+                admin_page() 
+    finally:
+        record_session_memory()
+        profiler.end_rerun()
\ No newline at end of file
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Admin DataFrame Benchmark
+
+Compares building the admin table with pd.DataFrame(list_of_dicts), which
+leaves every column as object dtype, against utils.frames.appointments_frame,
+which builds compact Arrow-backed and categorical columns. Reports build time,
+memory and the time to convert to an Arrow table, which is what st.dataframe
+does before sending the table to the browser. No Supabase connection is needed.
+
+Run from the repository root:
+    python -m benchmarks.admin_frame_benchmark [number_of_appointments]
+"""
+
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+import pandas as pd
+import pyarrow as pa
+from utils.frames import appointments_frame
+
+TYPES = ["Career Development", "Routine Check-up", "Urgent Care", "Performance Evaluation"]
+TIMES = ["10:00", "11:00", "12:00", "13:00", "14:00", "15:00", "16:00", "17:00"]
+STATUSES = ["pending", "accepted", "rejected", "cancelled"]
+
+def make_rows(count):
+    """Generate synthetic appointment rows shaped like the PostgREST response."""
+    rng = random.Random(42)
+    start = date(2025, 1, 1)
+    rows = []
+    for i in range(count):
+        rows.append({
+            'id': 1_700_000_000_000 + i,
+            'name': f"Person {i}",
+            'email': f"person{i}@example.com",
+            'phone': f"+1{rng.randrange(10**9, 10**10)}",
+            'appointment_type': rng.choice(TYPES),
+            'appointment_date': (start + timedelta(days=rng.randrange(365))).isoformat(),
+            'appointment_time': rng.choice(TIMES),
+            'reason': "Career advice about an upcoming review",
+            'notes': "",
+            'is_intern': rng.random() < 0.2,
+            'status': rng.choice(STATUSES),
+            'file_uploaded': False,
+            'file_url': None,
+            'thirst_trap_uploaded': False,
+            'thirst_trap_url': None,
+            'created_at': datetime(2025, 1, 1, 12, 0, rng.randrange(60)).isoformat()
+        })
+    return rows
+
+def measure(name, build, rows):
+    """Print build time, deep memory usage and Arrow conversion time of a frame builder."""
+    start = time.perf_counter()
+    frame = build(rows)
+    build_ms = (time.perf_counter() - start) * 1000
+    memory_mb = frame.memory_usage(deep=True).sum() / 1024 / 1024
+    start = time.perf_counter()
+    pa.Table.from_pandas(frame)
+    arrow_ms = (time.perf_counter() - start) * 1000
+    print(f"{name:22} build {build_ms:8.1f} ms   memory {memory_mb:7.1f} MB   to Arrow {arrow_ms:7.1f} ms")
+
+def main():
+    """Run the benchmark."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rows = make_rows(count)
+    print(f"{count} appointments\n")
+    measure("pd.DataFrame(rows)", pd.DataFrame, rows)
+    measure("appointments_frame", appointments_frame, rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Bulk Status Update Benchmark
+
+Compares storage.update_appointments_status against looping
+storage.update_appointment_status over the same rows. It inserts temporary
+appointments into the configured Supabase project and deletes them afterwards.
+
+Run from the repository root:
+    python -m benchmarks.bulk_status_benchmark [number_of_appointments]
+"""
+
+import sys
+import time
+from dotenv import load_dotenv
+from utils import storage
+from utils.db_connection import get_appointments_table
+
+# Load environment variables
+load_dotenv()
+
+# Base for the temporary IDs, far away from the timestamp-based IDs of real rows
+BENCHMARK_ID_BASE = 9_000_000_000_000
+
+def create_rows(count):
+    """Insert temporary appointments and return their IDs."""
+    ids = [BENCHMARK_ID_BASE + i for i in range(count)]
+    rows = [{
+        'id': appointment_id,
+        'name': "Benchmark",
+        'email': "benchmark@example.com",
+        'phone': "+10000000000",
+        'appointment_type': "Routine Check-up",
+        'appointment_date': "2000-01-01",
+        'appointment_time': "10:00",
+        'reason': "benchmark",
+        'status': "pending"
+    } for appointment_id in ids]
+    for start in range(0, count, 500):
+        get_appointments_table().insert(rows[start:start + 500]).execute()
+    return ids
+
+def delete_rows(ids):
+    """Delete the temporary appointments."""
+    for start in range(0, len(ids), storage.BULK_CHUNK_SIZE):
+        get_appointments_table().delete().in_('id', ids[start:start + storage.BULK_CHUNK_SIZE]).execute()
+
+def main():
+    """Run the benchmark."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    ids = create_rows(count)
+    try:
+        start = time.perf_counter()
+        for appointment_id in ids:
+            storage.update_appointment_status(appointment_id, "accepted")
+        loop_seconds = time.perf_counter() - start
+        print(f"Single-row loop: {count} updates in {loop_seconds:.2f}s ({count} requests)")
+
+        start = time.perf_counter()
+        success, outcomes = storage.update_appointments_status(ids, "rejected")
+        bulk_seconds = time.perf_counter() - start
+        requests = -(-count // storage.BULK_CHUNK_SIZE)
+        print(f"Bulk update:     {count} updates in {bulk_seconds:.2f}s ({requests} requests, success={success})")
+
+        print(f"\nSpeedup: {loop_seconds / bulk_seconds:.1f}x")
+    finally:
+        delete_rows(ids)
+
+if __name__ == "__main__":
+    main()
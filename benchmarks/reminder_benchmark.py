@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Reminder Tick Benchmark
+
+Times ReminderScheduler.tick with 1k, 10k and 100k pending reminders on a
+simulated clock. A tick with nothing due should cost the same at every
+size, and a tick sending a fixed number of reminders should only grow with
+log(pending). Nothing is sent and no database is needed.
+
+Run from the repository root:
+    python -m benchmarks.reminder_benchmark [ticks_per_size]
+"""
+
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from utils.reminders import ReminderScheduler
+
+SIZES = (1_000, 10_000, 100_000)
+# Reminders that come due between two timed ticks in the "due" case
+DUE_PER_TICK = 10
+
+class FakeClock:
+    """Clock that only moves when told to."""
+
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+def build(size, clock):
+    """Return a scheduler with `size` pending reminders, one minute apart, starting a day from now."""
+    first = datetime.fromtimestamp(clock.now).replace(second=0, microsecond=0) + timedelta(days=2)
+    rows = []
+    for i in range(size):
+        start = first + timedelta(minutes=i)
+        rows.append({
+            'id': i,
+            'email': "benchmark@example.com",
+            'appointment_date': start.strftime("%Y-%m-%d"),
+            'appointment_time': start.strftime("%H:%M"),
+            'status': "pending"
+        })
+    scheduler = ReminderScheduler(lambda row: None, lead_seconds=24 * 3600, clock=clock)
+    scheduler.schedule_many(rows)
+    return scheduler, first.timestamp() - 24 * 3600
+
+def time_ticks(scheduler, clock, ticks, step):
+    """Advance the clock by step before each tick and return the median tick time in microseconds."""
+    durations = []
+    for _ in range(ticks):
+        clock.now += step
+        start = time.perf_counter()
+        scheduler.tick()
+        durations.append((time.perf_counter() - start) * 1_000_000)
+    return statistics.median(durations)
+
+def main():
+    """Run the benchmark."""
+    ticks = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print(f"{'pending':>8}  {'idle tick':>12}  {f'tick sending {DUE_PER_TICK}':>18}")
+    for size in SIZES:
+        clock = FakeClock(time.time())
+        scheduler, first_fire = build(size, clock)
+        idle = time_ticks(scheduler, clock, ticks, 0)
+
+        # Jump to just before the first reminder, then let DUE_PER_TICK come due per tick
+        clock.now = first_fire - 1
+        due = time_ticks(scheduler, clock, min(ticks, size // DUE_PER_TICK), DUE_PER_TICK * 60)
+        print(f"{size:>8}  {idle:>9.2f} µs  {due:>15.2f} µs")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Rerun Benchmark
+
+Compares what filling in the booking form costs the server before and after
+the upload and intern sections became fragments.
+
+Before, the whole booking form was an st.form: editing a field sent nothing
+to the server, and the whole script reran once, on submit. The intern
+checkbox was inside the form too, so the thirst trap uploader only appeared
+after a submit. The "before" row runs app.py as of the repository's first
+commit with Streamlit's AppTest and times that full rerun.
+
+Now the text fields are still in an st.form and cost nothing to edit. The
+document upload and intern sections are fragments: ticking the checkbox or
+uploading a file reruns only that section. AppTest can't trigger a
+fragment-only rerun, so those rows run a script that renders only the
+fragment (the code Streamlit reruns) and time it after the interaction.
+Every row includes AppTest's own per-run overhead.
+
+Needs the same .env as the app, since app.py connects to Supabase on import.
+
+Run from the repository root:
+    python -m benchmarks.rerun_benchmark [number_of_reruns] [fragment_interactions_per_booking]
+"""
+
+import statistics
+import subprocess
+import sys
+import time
+from streamlit.testing.v1 import AppTest
+
+def intern_fragment():
+    """Script rendering only the intern checkbox fragment."""
+    import streamlit as st
+    import app
+    if "form_key" not in st.session_state:
+        st.session_state.form_key = 1
+    app.show_intern_section()
+
+def baseline_source():
+    """Return app.py as of the first commit, when the whole booking form was an st.form."""
+    first_commit = subprocess.run(["git", "rev-list", "--max-parents=0", "HEAD"],
+                                  capture_output=True, text=True, check=True).stdout.split()[0]
+    return subprocess.run(["git", "show", f"{first_commit}:app.py"],
+                          capture_output=True, text=True, check=True).stdout
+
+def time_reruns(app, count, edit=None):
+    """Run app once to warm up, then time count reruns, calling edit(app, index) before each; return ms durations."""
+    app.run()
+    durations = []
+    for index in range(count):
+        if edit is not None:
+            edit(app, index)
+        start = time.perf_counter()
+        app.run()
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+def toggle_intern(app, index):
+    """Tick or untick the intern checkbox, the interaction inside the intern fragment."""
+    checkbox = app.checkbox[0]
+    if checkbox.value:
+        checkbox.uncheck()
+    else:
+        checkbox.check()
+
+def report(label, durations):
+    """Print the median and worst of a list of durations."""
+    print(f"{label:44} p50 {statistics.median(durations):8.1f} ms   max {max(durations):8.1f} ms")
+
+def main():
+    """Run the benchmark."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    interactions = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+
+    before_submit = time_reruns(AppTest.from_string(baseline_source(), default_timeout=60), count)
+    after_submit = time_reruns(AppTest.from_file("app.py", default_timeout=60), count)
+    after_intern = time_reruns(AppTest.from_function(intern_fragment, default_timeout=60), count, toggle_intern)
+
+    print(f"{count} reruns each\n")
+    print("Before (everything in one st.form): no edit reruns anything")
+    report("  submit: full rerun", before_submit)
+    print("After (text fields in an st.form, upload and intern sections as fragments):")
+    print("  edit a text field: no rerun")
+    report("  toggle the intern checkbox: intern fragment", after_intern)
+    report("  submit: full rerun", after_submit)
+
+    per_interaction = statistics.median(after_intern)
+    print(f"\nA booking with {interactions} upload/intern interactions and one submit, at p50:")
+    print(f"  before: {statistics.median(before_submit):8.1f} ms (submit only)")
+    print(f"  after:  {statistics.median(after_submit) + interactions * per_interaction:8.1f} ms "
+          f"({interactions} x {per_interaction:.1f} ms of fragment reruns + submit)")
+
+if __name__ == "__main__":
+    main()
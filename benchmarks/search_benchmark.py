@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Appointment Search Benchmark
+
+Builds the in-memory search index over synthetic appointments and times
+prefix, multi-term and fuzzy queries. No Supabase connection is needed.
+
+Run from the repository root:
+    python -m benchmarks.search_benchmark [number_of_appointments]
+"""
+
+import random
+import sys
+import time
+from utils.search import AppointmentIndex
+
+FIRST_NAMES = ["Alice", "Bob", "Carmen", "Deepak", "Elena", "Farid", "Grace", "Hiro", "Ines", "Jonas",
+               "Keiko", "Liam", "Maya", "Noah", "Olga", "Pablo", "Qing", "Rosa", "Sven", "Tara"]
+LAST_NAMES = ["Smith", "Garcia", "Chen", "Patel", "Novak", "Kim", "Okafor", "Rossi", "Silva", "Zhang",
+              "Müller", "Dubois", "Ivanova", "Nguyen", "Haddad", "Larsen", "Costa", "Sato", "Reyes", "Berg"]
+WORDS = ["career", "advice", "resume", "review", "promotion", "checkup", "urgent", "feedback", "salary",
+         "interview", "project", "deadline", "mentor", "research", "paper", "thesis", "lab", "meeting"]
+
+def make_row(appointment_id, rng):
+    """Generate a synthetic appointment row."""
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    return {
+        'id': appointment_id,
+        'name': f"{first} {last}",
+        'email': f"{first.lower()}.{last.lower()}{appointment_id % 997}@example.com",
+        'phone': f"+1{rng.randrange(10**9, 10**10)}",
+        'reason': ' '.join(rng.choices(WORDS, k=8)),
+        'notes': ' '.join(rng.choices(WORDS, k=3)),
+    }
+
+def time_query(index, query, repeat=20):
+    """Return (matches, best time in ms) for a query."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        total, _ = index.search(query, page=2, page_size=20)
+        best = min(best, time.perf_counter() - start)
+    return total, best * 1000
+
+def main():
+    """Run the benchmark."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rng = random.Random(42)
+    index = AppointmentIndex()
+
+    start = time.perf_counter()
+    index.add_many(make_row(appointment_id, rng) for appointment_id in range(1, count + 1))
+    print(f"Indexed {count} appointments in {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    index.add(make_row(count + 1, rng))
+    print(f"Incremental insert: {(time.perf_counter() - start) * 1000:.3f} ms\n")
+
+    for query in ["grace", "gra", "chen thesis", "alice.smith", "1555", "promotion deadline mentor", "intervew", "x"]:
+        total, elapsed = time_query(index, query)
+        print(f"{query!r:32} {total:>7} matches  {elapsed:7.2f} ms")
+
+if __name__ == "__main__":
+    main()
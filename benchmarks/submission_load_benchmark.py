@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Submission Load Benchmark
+
+Simulates concurrent Streamlit sessions each booking an appointment with a
+document and a thirst trap (one insert, two uploads, one URL update), and
+reports submissions per second for:
+
+  - sync:  the blocking supabase client, one call after another
+  - async: the shared event loop in utils.async_db, uploads run concurrently
+
+Rows and objects are created in the configured Supabase project and removed
+afterwards.
+
+Run from the repository root:
+    python -m benchmarks.submission_load_benchmark [sessions] [submissions_per_session]
+"""
+
+import asyncio
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from utils import async_db
+from utils.db_connection import supabase
+
+# Load environment variables
+load_dotenv()
+
+BUCKETS = ("appointment-files", "thirst-traps")
+PAYLOAD = b"x" * 256 * 1024
+
+def make_row():
+    """Return a temporary appointment row."""
+    return {
+        'id': int(time.time() * 1_000_000) + uuid.uuid4().int % 1000,
+        'name': "Load Test",
+        'email': "load@example.com",
+        'phone': "+10000000000",
+        'appointment_type': "Routine Check-up",
+        'appointment_date': "2000-01-01",
+        'appointment_time': "10:00",
+        'reason': "benchmark",
+        'status': "pending"
+    }
+
+def submit_sync(created):
+    """Book one appointment with the blocking client."""
+    row = make_row()
+    supabase.table("appointments").insert(row).execute()
+    urls = {}
+    for bucket, column in zip(BUCKETS, ("file_url", "thirst_trap_url")):
+        path = f"loadtest-{uuid.uuid4()}.bin"
+        supabase.storage.from_(bucket).upload(path, PAYLOAD)
+        urls[column] = supabase.storage.from_(bucket).get_public_url(path)
+        created.append((bucket, path))
+    supabase.table("appointments").update(urls).eq("id", row['id']).execute()
+    return row['id']
+
+def submit_async(created):
+    """Book one appointment through the async bridge."""
+    row = make_row()
+    async_db.run(async_db.insert_row("appointments", row))
+    paths = [f"loadtest-{uuid.uuid4()}.bin" for _ in BUCKETS]
+    created.extend(zip(BUCKETS, paths))
+
+    async def upload_all():
+        return await asyncio.gather(*(async_db.upload_file(bucket, path, PAYLOAD) for bucket, path in zip(BUCKETS, paths)))
+
+    urls = dict(zip(("file_url", "thirst_trap_url"), async_db.run(upload_all())))
+    async_db.run(async_db.update_rows("appointments", urls, id=row['id']))
+    return row['id']
+
+def run_load(submit, sessions, per_session):
+    """Run submissions from concurrent threads and return (ids, created objects, submissions per second)."""
+    created = []
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        futures = [pool.submit(submit, created) for _ in range(sessions * per_session)]
+        ids = [future.result() for future in futures]
+    elapsed = time.perf_counter() - start
+    return ids, created, len(ids) / elapsed
+
+def cleanup(ids, created):
+    """Delete the temporary rows and objects."""
+    supabase.table("appointments").delete().in_("id", ids).execute()
+    for bucket in BUCKETS:
+        paths = [path for object_bucket, path in created if object_bucket == bucket]
+        if paths:
+            supabase.storage.from_(bucket).remove(paths)
+
+def main():
+    """Run the benchmark."""
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    per_session = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    for name, submit in (("sync", submit_sync), ("async", submit_async)):
+        ids, created, rate = run_load(submit, sessions, per_session)
+        try:
+            print(f"{name:6} {len(ids)} submissions from {sessions} sessions: {rate:.1f} submissions/s")
+        finally:
+            cleanup(ids, created)
+
+if __name__ == "__main__":
+    main()
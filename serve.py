@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+"""
+Server Launcher
+
+Starts the side HTTP server and the warm-up phase, then runs the Streamlit
+app in the same process, so connections and caches are primed before the
+first user arrives and /ready can be probed as soon as the server starts.
+
+Run from the repository root (extra arguments are passed to streamlit run):
+    python serve.py [--server.port 8501]
+"""
+
+import sys
+from streamlit.web import cli as stcli
+from utils import http_endpoints, warmup
+
+if __name__ == "__main__":
+    http_endpoints.start_server()
+    warmup.start()
+    sys.argv = ["streamlit", "run", "app.py", *sys.argv[1:]]
+    sys.exit(stcli.main())
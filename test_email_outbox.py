@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Email Outbox Test Script
+
+Sends a batch of confirmation emails through utils.email_outbox.EmailOutbox
+to a minimal SMTP sink on localhost, and checks that the whole batch goes
+over a single SMTP connection and that duplicate keys are only sent once.
+Runs under pytest or directly:
+    python test_email_outbox.py
+"""
+
+import socketserver
+import threading
+from utils.email_outbox import EmailOutbox, render_confirmation
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """SMTP server on a free local port that accepts every message and keeps it."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), SMTPHandler)
+        self.connections = 0
+        self.messages = []
+        self.lock = threading.Lock()
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough of RFC 5321 for smtplib: EHLO, MAIL, RCPT, DATA, RSET, NOOP and QUIT."""
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        with self.server.lock:
+            self.server.connections += 1
+        self.reply("220 localhost sink")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip().upper()
+            if command.startswith(("EHLO", "HELO")):
+                self.reply("250 localhost")
+            elif command.startswith(("MAIL", "RCPT", "RSET", "NOOP")):
+                self.reply("250 OK")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = []
+                for data_line in iter(self.rfile.readline, b""):
+                    if data_line == b".\r\n":
+                        break
+                    data.append(data_line)
+                with self.server.lock:
+                    self.server.messages.append(b"".join(data).decode())
+                self.reply("250 OK")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+def appointment(appointment_id):
+    """Return an appointment row for the confirmation template."""
+    return {
+        'id': appointment_id,
+        'name': "Test",
+        'email': f"test{appointment_id}@example.com",
+        'appointment_type': "Routine Check-up",
+        'appointment_date': "2030-01-03",
+        'appointment_time': "10:00"
+    }
+
+def test_batch_uses_one_connection_and_skips_duplicates():
+    """A batch of confirmations is sent over one SMTP connection, each key once."""
+    sink = SMTPSink()
+    threading.Thread(target=sink.serve_forever, daemon=True).start()
+    try:
+        outbox = EmailOutbox("127.0.0.1", sink.server_address[1], use_tls=False)
+        queued = [outbox.enqueue(f"confirmation:{i}", render_confirmation, appointment(i)) for i in range(20)]
+        # The change listener can see the same insert twice, e.g. locally and from another process
+        repeated = [outbox.enqueue(f"confirmation:{i}", render_confirmation, appointment(i)) for i in range(5)]
+        outbox.flush()
+
+        assert all(queued) and not any(repeated)
+        stats = outbox.stats()
+        assert (stats['sent'], stats['failed'], stats['duplicates']) == (20, 0, 5)
+        assert stats['messages_per_second'] > 0
+        assert sink.connections == 1
+        assert len(sink.messages) == 20
+        assert sum("To: test0@example.com" in message for message in sink.messages) == 1
+    finally:
+        sink.shutdown()
+        sink.server_close()
+
+if __name__ == "__main__":
+    test_batch_uses_one_connection_and_skips_duplicates()
+    print("✅ test_batch_uses_one_connection_and_skips_duplicates")
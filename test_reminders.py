@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Reminder Scheduler Test Script
+
+Drives utils.reminders.ReminderScheduler with a simulated clock, so no real
+time passes and nothing is sent: reminders fire once at their lead time,
+follow reschedules and cancellations, survive a restart through the
+checkpoint file, and only the reminder lease holder writes that file.
+Runs under pytest or directly:
+    python test_reminders.py
+"""
+
+import os
+import tempfile
+from datetime import datetime
+from utils.reminders import ReminderScheduler
+from utils.shared_state import SQLiteStateStore
+
+# Simulated "now": 2030-01-01 09:00 local time
+START = datetime(2030, 1, 1, 9, 0).timestamp()
+HOUR = 3600
+
+class FakeClock:
+    """Clock that only moves when told to."""
+
+    def __init__(self, now=START):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+def booking(appointment_id, day, time="10:00", status="pending"):
+    """Return an appointment row on January `day`, 2030."""
+    return {
+        'id': appointment_id,
+        'name': "Test",
+        'email': "test@example.com",
+        'appointment_type': "Routine Check-up",
+        'appointment_date': f"2030-01-{day:02d}",
+        'appointment_time': time,
+        'status': status
+    }
+
+def new_scheduler(checkpoint_path=None):
+    """Return a scheduler with a 24 hour lead on a fake clock, and the list of rows it sends."""
+    sent = []
+    clock = FakeClock()
+    scheduler = ReminderScheduler(sent.append, lead_seconds=24 * HOUR, clock=clock, checkpoint_path=checkpoint_path)
+    return scheduler, clock, sent
+
+def test_fires_once_at_lead_time():
+    """A reminder fires on the first tick at or after its lead time, and only once."""
+    scheduler, clock, sent = new_scheduler()
+    scheduler.schedule(booking(1, day=3))  # fires 2030-01-02 10:00, 25 hours from now
+
+    clock.advance(25 * HOUR - 1)
+    assert scheduler.tick() == 0
+    clock.advance(1)
+    assert scheduler.tick() == 1
+    assert [row['id'] for row in sent] == [1]
+
+    clock.advance(HOUR)
+    assert scheduler.tick() == 0
+    # The listener seeing the same booking again doesn't remind twice
+    scheduler.apply_change('update', booking(1, day=3))
+    assert len(scheduler) == 0
+
+def test_reschedule_and_cancel():
+    """Moving a booking moves its reminder; rejecting it or a past slot cancels it."""
+    scheduler, clock, sent = new_scheduler()
+    scheduler.schedule(booking(1, day=3))
+    scheduler.schedule(booking(2, day=3))
+    scheduler.schedule(booking(3, day=3))
+    scheduler.schedule(booking(4, day=1, time="08:00"))  # already over
+    assert len(scheduler) == 3
+
+    # Partial update: only the changed columns
+    scheduler.apply_change('update', {'id': 1, 'appointment_date': "2030-01-05"})
+    scheduler.apply_change('update', {'id': 2, 'status': "rejected"})
+    scheduler.cancel(3)
+
+    clock.advance(2 * 24 * HOUR)
+    assert scheduler.tick() == 0
+    clock.advance(2 * 24 * HOUR)
+    assert scheduler.tick() == 1
+    assert sent[0]['id'] == 1 and sent[0]['appointment_date'] == "2030-01-05"
+
+def test_failed_send_is_counted():
+    """A sender error is counted and doesn't stop the other reminders."""
+    def sender(row):
+        if row['id'] == 1:
+            raise RuntimeError("SMTP down")
+        sent.append(row)
+
+    sent = []
+    clock = FakeClock()
+    scheduler = ReminderScheduler(sender, lead_seconds=24 * HOUR, clock=clock)
+    scheduler.schedule_many([booking(1, day=3), booking(2, day=3)])
+    clock.advance(2 * 24 * HOUR)
+    assert scheduler.tick() == 1
+    assert (scheduler.fired, scheduler.failed) == (1, 1)
+
+def test_checkpoint_survives_restart():
+    """Pending reminders are restored after a restart and sent ones aren't repeated."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "reminders.json")
+        scheduler, clock, sent = new_scheduler(path)
+        scheduler.schedule_many([booking(1, day=3), booking(2, day=5)])
+        clock.advance(25 * HOUR)
+        assert scheduler.tick() == 1  # sending checkpoints right away
+
+        restarted, restarted_clock, restarted_sent = new_scheduler(path)
+        restarted_clock.now = clock.now
+        restarted.schedule_many([booking(1, day=3), booking(2, day=5)])  # catch-up from storage
+        assert len(restarted) == 1
+        restarted_clock.advance(4 * 24 * HOUR)
+        assert restarted.tick() == 1
+        assert [row['id'] for row in restarted_sent] == [2]
+
+def test_only_the_lease_holder_writes_the_checkpoint():
+    """Two processes sharing a state file elect one reminder leader; a leader that lost the lease stops checkpointing."""
+    with tempfile.TemporaryDirectory() as directory:
+        clock = FakeClock()
+        state_path = os.path.join(directory, "shared_state.db")
+        first = SQLiteStateStore(state_path, clock=clock)
+        second = SQLiteStateStore(state_path, clock=clock)
+        assert first.acquire_lease("reminders:leader", "first", ttl=90)
+        assert not second.acquire_lease("reminders:leader", "second", ttl=90)
+        assert first.acquire_lease("reminders:leader", "first", ttl=90)  # renewing
+
+        path = os.path.join(directory, "reminders.json")
+        scheduler = ReminderScheduler(lambda row: None, lead_seconds=24 * HOUR, clock=clock, checkpoint_path=path,
+                                      owner="first", holds_lease=lambda: first.get("reminders:leader") == "first")
+        scheduler.schedule(booking(1, day=3))
+        scheduler.checkpoint()
+        assert os.path.exists(path)
+
+        # The first leader stops renewing; once the lease expires the second takes over
+        clock.advance(91)
+        assert second.acquire_lease("reminders:leader", "second", ttl=90)
+        os.remove(path)
+        scheduler.checkpoint()
+        assert not os.path.exists(path)
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Upload Gate Test Script
+
+Checks that utils.upload_gate accepts text files in the encodings people
+actually upload, such as a cp1252 CSV saved by Excel, and still rejects
+binaries renamed to a text extension. Runs under pytest or directly:
+    python test_upload_gate.py
+"""
+
+import io
+from utils.upload_gate import check_upload
+
+MAX_BYTES = 20 * 1024 * 1024
+TEXT_EXTENSIONS = ["csv", "txt", "md"]
+
+class FakeUpload(io.BytesIO):
+    """Stand-in for a Streamlit UploadedFile: a BytesIO with a name and size."""
+
+    def __init__(self, name, content):
+        super().__init__(content)
+        self.name = name
+        self.size = len(content)
+
+def check(name, content):
+    """Run the upload gate on a text-extension upload."""
+    return check_upload(FakeUpload(name, content), TEXT_EXTENSIONS, MAX_BYTES)
+
+def test_cp1252_csv_is_accepted():
+    """Excel's default "Save as CSV" output is cp1252, which isn't valid UTF-8."""
+    content = "Name;Ville;Montant\r\nRenée Müller;Zürich;12,50 €\r\nJosé Peña;Málaga;7,00 €\r\n".encode("cp1252")
+    is_valid, error, content_type = check("export.csv", content)
+    assert is_valid, error
+    assert content_type == "text/csv"
+
+def test_utf16_and_utf8_text_is_accepted():
+    """UTF-16 with a BOM contains NUL bytes but is text; UTF-8 cut mid-character at the sniff limit is too."""
+    assert check("notes.txt", "Grüße\r\n".encode("utf-16"))[0]
+    assert check("notes.md", ("é" * 5000).encode("utf-8"))[0]
+
+def test_binary_renamed_to_text_is_rejected():
+    """Executables and other binaries are rejected even with a text extension."""
+    elf = b"\x7fELF\x02\x01\x01\x00" + bytes(range(256))
+    is_valid, error, _ = check("report.csv", elf)
+    assert not is_valid
+    assert "doesn't match" in error
+    assert not check("notes.txt", b"\x89PNG\r\n\x1a\n" + b"\x00" * 64)[0]
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+from collections import Counter
+from utils.db_connection import get_appointments_table
+from utils import storage, archive
+
+# Dimensions shown on the admin dashboard, mapped to their display titles
+DIMENSIONS = {
+    'appointment_type': "By Appointment Type",
+    'appointment_date': "By Day",
+    'appointment_time': "By Time Slot",
+    'status': "By Status",
+    'is_intern': "By Intern Status",
+}
+
+# Only these columns are fetched when the rollup is (re)built
+STAT_COLUMNS = ','.join(['id'] + list(DIMENSIONS))
+
+# PostgREST caps responses at 1000 rows by default, so the seed query is paged
+PAGE_SIZE = 1000
+
+# Rebuild the rollup from the database after this many seconds, to pick up
+# writes made by other processes
+ROLLUP_MAX_AGE_SECONDS = int(os.getenv("ANALYTICS_MAX_AGE_SECONDS", "600"))
+
+_lock = threading.Lock()
+_load_lock = threading.Lock()  # one rebuild at a time
+_rows = {}  # appointment id -> tuple of dimension values
+_counts = {dimension: Counter() for dimension in DIMENSIONS}
+_loaded_at = None
+_pending_changes = None  # rows changed while the rollup is being rebuilt, replayed afterwards
+
+def _dimension_values(row):
+    """Extract the grouped values of an appointment row, in DIMENSIONS order."""
+    values = []
+    for dimension in DIMENSIONS:
+        value = row.get(dimension)
+        if dimension == 'is_intern':
+            value = bool(value)
+        elif value is None:
+            value = 'unknown'
+        values.append(value)
+    return tuple(values)
+
+def _add(values, delta):
+    """Add delta to the counters of every dimension value."""
+    for dimension, value in zip(DIMENSIONS, values):
+        counter = _counts[dimension]
+        counter[value] += delta
+        if counter[value] <= 0:
+            del counter[value]
+
+def _scan_rows():
+    """Read the grouped columns of every appointment, archived ones first, with a paged query in id order."""
+    rows = {}
+    for row in archive.read_rows(STAT_COLUMNS.split(',')):
+        rows[row['id']] = _dimension_values(row)
+    start = 0
+    while True:
+        result = get_appointments_table().select(STAT_COLUMNS).order('id').range(start, start + PAGE_SIZE - 1).execute()
+        for row in result.data:
+            rows[row['id']] = _dimension_values(row)
+        if len(result.data) < PAGE_SIZE:
+            return rows
+        start += PAGE_SIZE
+
+def _is_stale():
+    return _loaded_at is None or time.monotonic() - _loaded_at > ROLLUP_MAX_AGE_SECONDS
+
+def load_rollup(only_if_stale=False):
+    """Rebuild the in-memory rollup with a paged query of the grouped columns only, plus the archive."""
+    global _loaded_at, _pending_changes
+    with _load_lock:
+        # Sessions that waited for another session's rebuild use its result
+        if only_if_stale and not _is_stale():
+            return
+        # Changes made while scanning might be missed by the scan, so they are replayed on top
+        with _lock:
+            _pending_changes = []
+        try:
+            rows = _scan_rows()
+        except Exception:
+            with _lock:
+                _pending_changes = None
+            raise
+        # Swap and replay in one step, so no change lands between them
+        with _lock:
+            _rows.clear()
+            _rows.update(rows)
+            for counter in _counts.values():
+                counter.clear()
+            for values in rows.values():
+                _add(values, 1)
+            for row in _pending_changes:
+                _apply_row(row)
+            _pending_changes = None
+            _loaded_at = time.monotonic()
+
+def _apply_row(row):
+    """Apply an inserted or updated row to the rollup; called with _lock held."""
+    appointment_id = row['id']
+    old_values = _rows.get(appointment_id)
+    if old_values is not None:
+        # Partial updates only carry the changed columns
+        merged = dict(zip(DIMENSIONS, old_values))
+        merged.update({key: value for key, value in row.items() if key in DIMENSIONS})
+        row = merged
+        _add(old_values, -1)
+    new_values = _dimension_values(row)
+    _rows[appointment_id] = new_values
+    _add(new_values, 1)
+
+def apply_change(event, row):
+    """Incrementally update the rollup from an inserted or updated appointment row."""
+    if row.get('id') is None:
+        return
+    with _lock:
+        if _pending_changes is not None:
+            _pending_changes.append(row)
+        if _loaded_at is None:
+            # Nothing to update yet; a load in progress replays it, and a later one reads it from the table
+            return
+        _apply_row(row)
+
+def get_statistics():
+    """Return appointment counts per dimension, loading the rollup on first use."""
+    try:
+        if _is_stale():
+            load_rollup(only_if_stale=True)
+        with _lock:
+            stats = {dimension: dict(counter) for dimension, counter in _counts.items()}
+            stats['total'] = len(_rows)
+        return True, stats
+    except Exception as e:
+        return False, str(e)
+
+storage.add_change_listener(apply_change, remote=True)
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Appointment Archive
+
+Moves appointments older than a horizon out of the `appointments` table into
+zstd-compressed Parquet files under data/archive, in batches, so the hot
+table stays small. Archived appointments stay readable through
+get_archived_appointment and read_rows.
+
+Archived rows are deleted from the table, so ARCHIVE_DIR must be storage
+every process reads from (e.g. a network volume mounted on every host);
+a host-local directory hides the other hosts' archives.
+
+Run once from the repository root:
+    python -m utils.archive [days]
+"""
+
+import os
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+import pyarrow as pa
+import pyarrow.parquet as pq
+from dotenv import load_dotenv
+from utils.db_connection import get_appointments_table
+from utils.frames import BOOLEAN_COLUMNS
+from utils.models import APPOINTMENT_FIELDS, from_row, dumps, loads
+
+# Load environment variables
+load_dotenv()
+
+# Must be shared by every host running the app, since archived rows only exist here
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", os.path.join("data", "archive"))
+# Appointments dated more than this many days ago are archived; unset disables the background archiver
+ARCHIVE_AFTER_DAYS = os.getenv("ARCHIVE_AFTER_DAYS")
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+ARCHIVE_INTERVAL_SECONDS = float(os.getenv("ARCHIVE_INTERVAL_SECONDS", "3600"))
+
+# IDs per delete request, kept small enough for the filter to fit in the request URL
+DELETE_CHUNK_SIZE = 200
+
+# Table columns that aren't Appointment fields (e.g. legacy file_path) are kept as a JSON object in this column
+EXTRA_COLUMNS = "extra_columns"
+
+# Every archive file has the same schema, so files can be read together
+ARCHIVE_SCHEMA = pa.schema([
+    (name, pa.int64() if name == 'id' else pa.bool_() if name in BOOLEAN_COLUMNS else pa.string())
+    for name in APPOINTMENT_FIELDS
+] + [(EXTRA_COLUMNS, pa.string())])
+
+_lock = threading.Lock()
+_files = ()  # archive file names the index was built from
+_index = {}  # appointment id -> archive file name
+_archiver_started = False
+
+def _archive_files():
+    """Return the names of the archive files, oldest batch first."""
+    if not os.path.isdir(ARCHIVE_DIR):
+        return ()
+    return tuple(sorted(name for name in os.listdir(ARCHIVE_DIR) if name.endswith(".parquet")))
+
+def _get_index():
+    """Return the id -> file index, rebuilt from the ID columns when the set of files changed."""
+    global _files
+    files = _archive_files()
+    with _lock:
+        if files != _files:
+            known = set(_files)
+            for name in files:
+                if name not in known:
+                    ids = pq.read_table(os.path.join(ARCHIVE_DIR, name), columns=['id']).column('id').to_pylist()
+                    _index.update(dict.fromkeys(ids, name))
+            _files = files
+        return _index
+
+def _archive_row(row):
+    """Return a table row as an archive row, keeping the columns Appointment doesn't know in EXTRA_COLUMNS."""
+    appointment = from_row(row)
+    archived = {field: getattr(appointment, field) for field in APPOINTMENT_FIELDS}
+    extra = {key: value for key, value in row.items() if key not in archived}
+    archived[EXTRA_COLUMNS] = dumps(extra).decode() if extra else None
+    return archived
+
+def _write_batch(rows):
+    """Write rows to a new archive file, atomically, and add them to the index."""
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    ids = [row['id'] for row in rows]
+    name = f"appointments-{min(ids):020d}-{max(ids):020d}.parquet"
+    table = pa.Table.from_pylist([_archive_row(row) for row in rows], schema=ARCHIVE_SCHEMA)
+    path = os.path.join(ARCHIVE_DIR, name)
+    # Unique per writer, so archivers in several processes never write into each other's file
+    temp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+    try:
+        pq.write_table(table, temp_path, compression="zstd")
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    with _lock:
+        _index.update(dict.fromkeys(ids, name))
+
+def archive_batch(cutoff_date, batch_size=ARCHIVE_BATCH_SIZE):
+    """
+    Archive one batch of appointments dated before cutoff_date.
+
+    Rows are written to Parquet before they are deleted from the table, and
+    rows already in the archive (from a batch interrupted before its delete)
+    are only deleted, so an interrupted run is safely retried.
+
+    Returns:
+        int: Number of appointments moved out of the table
+    """
+    result = (get_appointments_table().select('*')
+              .lt('appointment_date', cutoff_date.isoformat())
+              .order('id').limit(batch_size).execute())
+    if not result.data:
+        return 0
+
+    archived = _get_index()
+    new_rows = [row for row in result.data if row['id'] not in archived]
+    if new_rows:
+        _write_batch(new_rows)
+
+    ids = [row['id'] for row in result.data]
+    for start in range(0, len(ids), DELETE_CHUNK_SIZE):
+        get_appointments_table().delete().in_('id', ids[start:start + DELETE_CHUNK_SIZE]).execute()
+    return len(ids)
+
+def archive_old_appointments(days, batch_size=ARCHIVE_BATCH_SIZE):
+    """
+    Archive every appointment dated more than `days` days ago, one batch at a time.
+
+    Returns:
+        tuple: (success, number of appointments archived or error message)
+    """
+    cutoff_date = datetime.now().date() - timedelta(days=days)
+    total = 0
+    try:
+        while True:
+            moved = archive_batch(cutoff_date, batch_size)
+            total += moved
+            if moved < batch_size:
+                return True, total
+    except Exception as e:
+        print(f"Error archiving appointments after {total} rows: {e}")
+        return False, str(e)
+
+def get_archived_appointment(appointment_id):
+    """Return an archived appointment as an Appointment, or None if it isn't archived."""
+    name = _get_index().get(appointment_id)
+    if name is None:
+        return None
+    table = pq.read_table(os.path.join(ARCHIVE_DIR, name), columns=list(APPOINTMENT_FIELDS),
+                          filters=[('id', '=', appointment_id)])
+    rows = table.to_pylist()
+    return from_row(rows[0]) if rows else None
+
+def read_rows(columns=None):
+    """
+    Return every archived appointment as a row dict, optionally with only some columns.
+
+    Without columns, rows have the Appointment fields. Other requested
+    columns, such as legacy file_path, come from the archived extra columns
+    and are None where a row didn't have them.
+    """
+    files = _archive_files()
+    if not files:
+        return []
+    columns = list(dict.fromkeys(['id', *(columns or APPOINTMENT_FIELDS)]))
+    extra_columns = [column for column in columns if column not in APPOINTMENT_FIELDS]
+    rows = {}
+    for name in files:
+        path = os.path.join(ARCHIVE_DIR, name)
+        stored = set(pq.read_schema(path).names)
+        read = [column for column in columns if column in stored]
+        if extra_columns and EXTRA_COLUMNS in stored:
+            read.append(EXTRA_COLUMNS)
+        for row in pq.read_table(path, columns=read).to_pylist():
+            extra = row.pop(EXTRA_COLUMNS, None)
+            extra = loads(extra) if extra else {}
+            for column in extra_columns:
+                row.setdefault(column, extra.get(column))
+            # A batch retried after an interrupted run may be archived twice
+            rows[row['id']] = row
+    return list(rows.values())
+
+def check_archive_dir():
+    """Raise an exception if archiving is enabled but ARCHIVE_DIR can't be written, checked by writing a probe file."""
+    if not ARCHIVE_AFTER_DAYS:
+        return "archiving disabled"
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    probe = os.path.join(ARCHIVE_DIR, f".probe-{uuid.uuid4().hex}")
+    try:
+        with open(probe, "wb"):
+            pass
+        os.remove(probe)
+    except OSError as e:
+        raise Exception(f"ARCHIVE_DIR {ARCHIVE_DIR} is not writable: {e}") from e
+    return f"{len(_archive_files())} archive files in {os.path.abspath(ARCHIVE_DIR)}"
+
+def _run_archiver(days):
+    """Archive old appointments every ARCHIVE_INTERVAL_SECONDS."""
+    while True:
+        success, result = archive_old_appointments(days)
+        if success and result:
+            print(f"Archived {result} appointments")
+        time.sleep(ARCHIVE_INTERVAL_SECONDS)
+
+def start_archiver():
+    """Start the process-wide background archiver, if ARCHIVE_AFTER_DAYS is set."""
+    global _archiver_started
+    if not ARCHIVE_AFTER_DAYS:
+        return False
+    with _lock:
+        if _archiver_started:
+            return True
+        _archiver_started = True
+    threading.Thread(target=_run_archiver, args=(int(ARCHIVE_AFTER_DAYS),), name="archiver", daemon=True).start()
+    return True
+
+if __name__ == "__main__":
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else int(ARCHIVE_AFTER_DAYS or "365")
+    success, result = archive_old_appointments(days)
+    print(f"✅ Archived {result} appointments" if success else f"❌ Archiving failed: {result}")
@@ -0,0 +1,127 @@
+import asyncio
+import os
+import threading
+from urllib.parse import quote
+import httpx
+from dotenv import load_dotenv
+from utils import models
+
+# Load environment variables
+load_dotenv()
+
+# Supabase credentials
+SUPABASE_URL = (os.getenv("SUPABASE_URL") or "").rstrip("/")
+SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+
+# Connection pool shared by every Streamlit session in this process
+MAX_CONNECTIONS = int(os.getenv("SUPABASE_MAX_CONNECTIONS", "20"))
+REQUEST_TIMEOUT_SECONDS = 60
+
+_loop = None
+_client = None
+_loop_lock = threading.Lock()
+
+def _get_loop():
+    """Start the process-wide event loop on a daemon thread on first use."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="supabase-async", daemon=True).start()
+            _loop = loop
+    return _loop
+
+def run(coroutine, timeout=None):
+    """
+    Run a coroutine on the shared event loop and wait for its result.
+
+    This is the bridge used by the synchronous Streamlit code: the calling
+    script thread blocks, while the loop keeps serving other sessions.
+    """
+    return asyncio.run_coroutine_threadsafe(coroutine, _get_loop()).result(timeout)
+
+def _get_client():
+    """Return the shared HTTP client; must be called from the event loop."""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            base_url=SUPABASE_URL,
+            headers={"apikey": SUPABASE_KEY, "Authorization": f"Bearer {SUPABASE_KEY}"},
+            limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS),
+            timeout=REQUEST_TIMEOUT_SECONDS
+        )
+    return _client
+
+def _check(response):
+    """Raise an exception carrying the error body for failed responses."""
+    if response.is_error:
+        raise Exception(f"Supabase request failed ({response.status_code}): {response.text}")
+    return response
+
+async def insert_row(table, row):
+    """Insert a row (dict or Appointment) and return the inserted representation."""
+    response = _check(await _get_client().post(
+        f"/rest/v1/{table}",
+        content=models.dumps(row),
+        headers={"Content-Type": "application/json", "Prefer": "return=representation"}
+    ))
+    return models.loads(response.content)
+
+async def update_rows(table, values, **filters):
+    """Update rows matching equality filters, e.g. update_rows("appointments", {...}, id=5)."""
+    params = {column: f"eq.{value}" for column, value in filters.items()}
+    response = _check(await _get_client().patch(
+        f"/rest/v1/{table}",
+        content=models.dumps(values),
+        params=params,
+        headers={"Content-Type": "application/json", "Prefer": "return=representation"}
+    ))
+    return models.loads(response.content)
+
+async def select_rows(table, columns="*", start=None, end=None, **filters):
+    """Select rows matching equality filters, optionally limited to the row range [start, end]."""
+    params = {"select": columns}
+    params.update({column: f"eq.{value}" for column, value in filters.items()})
+    headers = {}
+    if start is not None:
+        headers["Range-Unit"] = "items"
+        headers["Range"] = f"{start}-{end}"
+    response = _check(await _get_client().get(f"/rest/v1/{table}", params=params, headers=headers))
+    return models.loads(response.content)
+
+async def select_all_rows(table, columns="*", page_size=1000, **filters):
+    """
+    Select every row matching equality filters with a keyset scan on id.
+
+    Each page asks for ids greater than the last one seen, ordered by id, so
+    rows inserted or deleted between pages can't shift the pages and make
+    other rows be skipped or returned twice, as OFFSET/Range paging can.
+    """
+    if columns != "*" and "id" not in columns.split(","):
+        columns = f"id,{columns}"
+    rows = []
+    last_id = None
+    while True:
+        params = {"select": columns, "order": "id.asc", "limit": str(page_size)}
+        params.update({column: f"eq.{value}" for column, value in filters.items()})
+        if last_id is not None:
+            params["id"] = f"gt.{last_id}"
+        response = _check(await _get_client().get(f"/rest/v1/{table}", params=params))
+        page = models.loads(response.content)
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+        last_id = page[-1]["id"]
+
+async def upload_file(bucket, path, content, content_type=None):
+    """Upload bytes to a storage bucket and return the object's public URL."""
+    _check(await _get_client().post(
+        f"/storage/v1/object/{bucket}/{quote(path)}",
+        content=content,
+        headers={"Content-Type": content_type or "application/octet-stream", "x-upsert": "false"}
+    ))
+    return get_public_url(bucket, path)
+
+def get_public_url(bucket, path):
+    """Return the public URL of an object in a public bucket."""
+    return f"{SUPABASE_URL}/storage/v1/object/public/{bucket}/{quote(path)}"
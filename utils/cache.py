@@ -0,0 +1,104 @@
+import threading
+import time
+from collections import OrderedDict
+
+class LRUCache:
+    """Thread-safe bounded LRU cache with an optional time-to-live per entry.
+
+    Streamlit runs each session's script in its own thread, so every
+    operation takes the cache lock. A reader that misses should take
+    generation() before loading the value and pass it to put(), so a value
+    loaded before a concurrent invalidate() is not cached afterwards.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._generation = 0  # bumped by every invalidate() and clear()
+        self._tombstones = OrderedDict()  # key -> generation of its latest invalidation
+        self._tombstone_floor = 0  # newest generation of the tombstones evicted so far
+
+    def __len__(self):
+        return len(self._data)
+
+    def _lookup(self, key, now):
+        entry = self._data.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= now:
+            del self._data[key]
+            return False, None
+        self._data.move_to_end(key)
+        return True, value
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default on a miss."""
+        with self._lock:
+            found, value = self._lookup(key, time.monotonic())
+            if found:
+                self.hits += 1
+                return value
+            self.misses += 1
+            return default
+
+    def generation(self):
+        """Return the current invalidation generation, to pass to put() after loading a value."""
+        with self._lock:
+            return self._generation
+
+    def put(self, key, value, generation=None):
+        """
+        Store value under key, evicting the least recently used entries when full.
+
+        With a generation from generation(), the value is dropped (and False
+        returned) if key was invalidated after that generation was taken.
+        """
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            if generation is not None and max(self._tombstones.get(key, 0), self._tombstone_floor) > generation:
+                return False
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+            return True
+
+    def invalidate(self, key):
+        """Remove key from the cache if present, and reject values for it loaded before now."""
+        with self._lock:
+            self._data.pop(key, None)
+            self._generation += 1
+            self._tombstones[key] = self._generation
+            self._tombstones.move_to_end(key)
+            while len(self._tombstones) > self.maxsize:
+                # Forgetting a tombstone rejects every put older than it, which is only ever a miss
+                _, generation = self._tombstones.popitem(last=False)
+                self._tombstone_floor = max(self._tombstone_floor, generation)
+
+    def clear(self):
+        """Remove every entry, and reject values loaded before now."""
+        with self._lock:
+            self._data.clear()
+            self._generation += 1
+            self._tombstones.clear()
+            self._tombstone_floor = self._generation
+
+    def stats(self):
+        """Return hit/miss counters and the hit ratio."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': self.hits / lookups if lookups else 0.0
+            }
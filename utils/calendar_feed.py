@@ -0,0 +1,174 @@
+import hashlib
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+# Columns needed to render calendar events
+FEED_COLUMN_LIST = ('id', 'name', 'appointment_type', 'appointment_date', 'appointment_time', 'status', 'created_at')
+FEED_COLUMNS = ','.join(FEED_COLUMN_LIST)
+
+# Length of every appointment in the calendar
+EVENT_DURATION = timedelta(hours=1)
+
+# Statuses shown as cancelled events instead of confirmed/tentative ones
+CANCELLED_STATUSES = {'rejected', 'cancelled'}
+
+FEED_HEADER = (
+    "BEGIN:VCALENDAR\r\n"
+    "VERSION:2.0\r\n"
+    "PRODID:-//Xiaoyue's Office Hours//Appointments//EN\r\n"
+    "CALSCALE:GREGORIAN\r\n"
+    "X-WR-CALNAME:Office Hours Appointments\r\n"
+).encode()
+FEED_FOOTER = b"END:VCALENDAR\r\n"
+
+def _escape(text):
+    """Escape a TEXT value as required by RFC 5545."""
+    return (str(text or '').replace('\\', '\\\\').replace(';', '\\;')
+            .replace(',', '\\,').replace('\r\n', '\\n').replace('\n', '\\n'))
+
+def _fold(line):
+    """Fold a content line to at most 75 octets per physical line."""
+    data = line.encode()
+    if len(data) <= 75:
+        return data + b"\r\n"
+    parts = []
+    while len(data) > 75:
+        cut = 75 if not parts else 74
+        # Never split a multi-byte UTF-8 character
+        while cut > 0 and (data[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(data[:cut])
+        data = data[cut:]
+    parts.append(data)
+    return b"\r\n ".join(parts) + b"\r\n"
+
+def render_event(row):
+    """Render an appointment row as a VEVENT block, or None if it has no valid date and time."""
+    try:
+        start = datetime.strptime(f"{row['appointment_date']} {row['appointment_time']}", "%Y-%m-%d %H:%M")
+    except (KeyError, TypeError, ValueError):
+        return None
+    end = start + EVENT_DURATION
+    status = row.get('status') or 'pending'
+    if status in CANCELLED_STATUSES:
+        ics_status = 'CANCELLED'
+    elif status == 'accepted':
+        ics_status = 'CONFIRMED'
+    else:
+        ics_status = 'TENTATIVE'
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:appointment-{row['id']}@office-hours",
+        f"DTSTAMP:{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}",
+        f"DTSTART:{start.strftime('%Y%m%dT%H%M%S')}",
+        f"DTEND:{end.strftime('%Y%m%dT%H%M%S')}",
+        f"SUMMARY:{_escape(row.get('appointment_type'))} with {_escape(row.get('name'))}",
+        f"STATUS:{ics_status}",
+        "END:VEVENT",
+    ]
+    return b"".join(_fold(line) for line in lines)
+
+class CalendarFeed:
+    """ICS feed of appointments kept in memory as one rendered block per event.
+
+    Changed rows re-render only their own event, and the ETag is the XOR of
+    per-event content hashes, so it is updated in constant time and most
+    polls can be answered with 304 Not Modified without touching the database.
+    """
+
+    def __init__(self, load_rows, max_age_seconds=900):
+        self._load_rows = load_rows
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()  # one reload at a time
+        self._pending = None  # rows changed while the feed is being reloaded, replayed afterwards
+        self._rows = {}  # appointment id -> row
+        self._events = {}  # appointment id -> (rendered event, digest)
+        self._digest = 0
+        self._loaded_at = None
+
+    def _set_event(self, appointment_id, row):
+        old = self._events.pop(appointment_id, None)
+        if old is not None:
+            self._digest ^= old[1]
+        # DTSTAMP changes on every render, so hash the source fields instead of the output
+        event = render_event(row)
+        if event is None:
+            return
+        source = '|'.join(str(row.get(column)) for column in FEED_COLUMN_LIST)
+        digest = int.from_bytes(hashlib.sha256(source.encode()).digest()[:16], 'big')
+        self._events[appointment_id] = (event, digest)
+        self._digest ^= digest
+
+    def _is_fresh(self):
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.max_age_seconds
+
+    def _ensure_loaded(self):
+        if self._is_fresh():
+            return
+        with self._load_lock:
+            # Requests that waited for another request's reload use its result
+            if self._is_fresh():
+                return
+            # Changes made while loading might be missed by the load, so they are replayed on top
+            with self._lock:
+                self._pending = []
+            try:
+                rows = self._load_rows()
+            except Exception:
+                with self._lock:
+                    self._pending = None
+                raise
+            # Swap and replay in one step, so no change lands between them
+            with self._lock:
+                self._rows = {}
+                self._events = {}
+                self._digest = 0
+                for row in rows:
+                    self._rows[row['id']] = row
+                    self._set_event(row['id'], row)
+                for row in self._pending:
+                    self._apply_row(row)
+                self._pending = None
+                self._loaded_at = time.monotonic()
+
+    def _apply_row(self, row):
+        """Merge a changed row into the feed; called with _lock held."""
+        appointment_id = row['id']
+        # Partial updates only carry the changed columns
+        merged = dict(self._rows.get(appointment_id, {}))
+        merged.update((column, row[column]) for column in FEED_COLUMN_LIST if column in row)
+        self._rows[appointment_id] = merged
+        self._set_event(appointment_id, merged)
+
+    def apply_change(self, event, row):
+        """Re-render the event of an inserted or updated appointment."""
+        if row.get('id') is None:
+            return
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(row)
+            if self._loaded_at is None:
+                # Nothing to update yet; a load in progress replays it, and a later one reads it from the table
+                return
+            self._apply_row(row)
+
+    def snapshot(self):
+        """
+        Return the current ETag and a generator over the feed.
+        
+        The generator yields byte chunks, one per event, so the whole
+        document is never built in memory.
+        """
+        self._ensure_loaded()
+        with self._lock:
+            etag = f'"{self._digest:032x}-{len(self._events)}"'
+            # Rendered events are immutable, so a snapshot of the references is enough
+            events = [event for event, _ in self._events.values()]
+        return etag, self._stream(events)
+
+    def _stream(self, events):
+        yield FEED_HEADER
+        yield from events
+        yield FEED_FOOTER
@@ -0,0 +1,235 @@
+import os
+import queue
+import smtplib
+import threading
+import time
+from collections import OrderedDict
+from email.message import EmailMessage
+from string import Template
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# SMTP settings; the outbox is disabled when SMTP_HOST is not set
+SMTP_HOST = os.getenv("SMTP_HOST")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_USERNAME = os.getenv("SMTP_USERNAME")
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
+SMTP_USE_TLS = os.getenv("SMTP_USE_TLS", "true").lower() == "true"
+EMAIL_FROM = os.getenv("EMAIL_FROM", SMTP_USERNAME or "no-reply@localhost")
+
+# Messages sent per batch before the worker checks the queue again
+BATCH_SIZE = 50
+# Delivery attempts per message, with exponential backoff between them
+MAX_ATTEMPTS = 3
+RETRY_BACKOFF_SECONDS = 2.0
+# Close the SMTP connection after this long without messages
+IDLE_TIMEOUT_SECONDS = 60
+# How many recently enqueued message keys are remembered for deduplication
+DEDUP_WINDOW = 10_000
+
+CONFIRMATION_SUBJECT = Template("Appointment request received: $appointment_type on $appointment_date")
+CONFIRMATION_BODY = Template("""Hi $name,
+
+Your appointment request has been received.
+
+Confirmation Number: $id
+Date: $appointment_date
+Time: $appointment_time
+Type: $appointment_type
+
+We'll be in touch once it has been reviewed.
+
+Xiaoyue's Office Hours
+""")
+
+REMINDER_SUBJECT = Template("Reminder: $appointment_type on $appointment_date at $appointment_time")
+REMINDER_BODY = Template("""Hi $name,
+
+This is a reminder of your upcoming appointment.
+
+Confirmation Number: $id
+Date: $appointment_date
+Time: $appointment_time
+Type: $appointment_type
+
+Xiaoyue's Office Hours
+""")
+
+def render_confirmation(appointment):
+    """Render the confirmation email for an appointment row."""
+    message = EmailMessage()
+    message["From"] = EMAIL_FROM
+    message["To"] = appointment["email"]
+    message["Subject"] = CONFIRMATION_SUBJECT.safe_substitute(appointment)
+    message.set_content(CONFIRMATION_BODY.safe_substitute(appointment))
+    return message
+
+def render_reminder(appointment):
+    """Render the reminder email for an appointment row."""
+    message = EmailMessage()
+    message["From"] = EMAIL_FROM
+    message["To"] = appointment["email"]
+    message["Subject"] = REMINDER_SUBJECT.safe_substitute(appointment)
+    message.set_content(REMINDER_BODY.safe_substitute(appointment))
+    return message
+
+class EmailOutbox:
+    """Queue of outgoing emails delivered by a background worker.
+
+    The worker renders messages and sends them in batches over a single
+    persistent SMTP connection, so booking an appointment never waits on
+    SMTP. Messages are deduplicated by key and retried with backoff.
+    To test locally, point it at an SMTP sink such as aiosmtpd:
+    `python -m aiosmtpd -n -l localhost:8025`.
+    """
+
+    def __init__(self, host, port=587, username=None, password=None, use_tls=True):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self._queue = queue.Queue()
+        self._seen = OrderedDict()
+        self._seen_lock = threading.Lock()
+        self._connection = None
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        self.sent = 0
+        self.failed = 0
+        self.duplicates = 0
+        self.send_seconds = 0.0
+
+    def enqueue(self, key, render, payload):
+        """
+        Queue a message for delivery unless one with the same key was already queued.
+
+        Args:
+            key: Deduplication key, e.g. "confirmation:<appointment id>"
+            render: Function building an EmailMessage from payload, run on the worker
+            payload: Data passed to render
+
+        Returns:
+            bool: True if the message was queued, False if it was a duplicate
+        """
+        with self._seen_lock:
+            if key in self._seen:
+                self.duplicates += 1
+                return False
+            self._seen[key] = True
+            if len(self._seen) > DEDUP_WINDOW:
+                self._seen.popitem(last=False)
+        self._queue.put((key, render, payload))
+        self._ensure_worker()
+        return True
+
+    def flush(self):
+        """Block until every queued message has been sent or has failed."""
+        self._queue.join()
+
+    def stats(self):
+        """Return delivery counters and the send throughput in messages per second."""
+        return {
+            'queued': self._queue.qsize(),
+            'sent': self.sent,
+            'failed': self.failed,
+            'duplicates': self.duplicates,
+            'messages_per_second': self.sent / self.send_seconds if self.send_seconds else 0.0
+        }
+
+    def _ensure_worker(self):
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="email-outbox", daemon=True)
+                self._worker.start()
+
+    def _connect(self):
+        if self._connection is None:
+            connection = smtplib.SMTP(self.host, self.port, timeout=30)
+            if self.use_tls:
+                connection.starttls()
+            if self.username:
+                connection.login(self.username, self.password)
+            self._connection = connection
+        return self._connection
+
+    def _disconnect(self):
+        if self._connection is not None:
+            try:
+                self._connection.quit()
+            except Exception:
+                pass
+            self._connection = None
+
+    def _send(self, message):
+        """Send one message, reconnecting and retrying with backoff on failure."""
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            try:
+                self._connect().send_message(message)
+                return True
+            except Exception as e:
+                print(f"Error sending email to {message['To']} (attempt {attempt}/{MAX_ATTEMPTS}): {e}")
+                self._disconnect()
+                if attempt < MAX_ATTEMPTS:
+                    time.sleep(RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1))
+        return False
+
+    def _run(self):
+        while True:
+            try:
+                batch = [self._queue.get(timeout=IDLE_TIMEOUT_SECONDS)]
+            except queue.Empty:
+                self._disconnect()
+                continue
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            start = time.perf_counter()
+            for key, render, payload in batch:
+                try:
+                    delivered = self._send(render(payload))
+                except Exception as e:
+                    print(f"Error rendering email {key}: {e}")
+                    delivered = False
+                if delivered:
+                    self.sent += 1
+                else:
+                    self.failed += 1
+                    # Allow the message to be queued again later
+                    with self._seen_lock:
+                        self._seen.pop(key, None)
+                self._queue.task_done()
+            self.send_seconds += time.perf_counter() - start
+
+_outbox = None
+_outbox_lock = threading.Lock()
+
+def get_outbox():
+    """Return the process-wide outbox, or None when SMTP is not configured."""
+    global _outbox
+    if not SMTP_HOST:
+        return None
+    with _outbox_lock:
+        if _outbox is None:
+            _outbox = EmailOutbox(SMTP_HOST, SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD, SMTP_USE_TLS)
+    return _outbox
+
+def enqueue_confirmation(event, row):
+    """Change listener queueing a confirmation email for each newly inserted appointment."""
+    outbox = get_outbox()
+    if outbox is None or event != 'insert' or not row.get('email'):
+        return
+    outbox.enqueue(f"confirmation:{row.get('id')}", render_confirmation, dict(row))
+
+def enqueue_reminder(row):
+    """Reminder sender queueing a reminder email for an upcoming appointment."""
+    outbox = get_outbox()
+    if outbox is None or not row.get('email'):
+        return
+    key = f"reminder:{row.get('id')}:{row.get('appointment_date')}:{row.get('appointment_time')}"
+    outbox.enqueue(key, render_reminder, dict(row))
@@ -0,0 +1,69 @@
+import pandas as pd
+import pyarrow as pa
+from utils.models import APPOINTMENT_FIELDS, LEGACY_COLUMNS
+
+# Arrow-backed strings keep text in one contiguous buffer instead of a Python object per cell
+STRING_DTYPE = pd.StringDtype("pyarrow")
+
+# Low-cardinality text columns, stored as integer codes plus one copy of each value
+CATEGORY_COLUMNS = ('appointment_type', 'appointment_time', 'status')
+BOOLEAN_COLUMNS = ('is_intern', 'file_uploaded', 'thirst_trap_uploaded')
+DATE_COLUMNS = ('appointment_date',)
+TIMESTAMP_COLUMNS = ('created_at',)
+
+# Admin table column order: the ID first, then the model's fields
+COLUMN_ORDER = ('id',) + tuple(column for column in APPOINTMENT_FIELDS if column != 'id')
+
+def _strings(values):
+    """Build an Arrow string array from Python values without copying them into objects again."""
+    try:
+        return pa.array(values, type=pa.string())
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Mixed types, e.g. a phone number stored as a number in some rows
+        return pa.array([None if value is None else str(value) for value in values], type=pa.string())
+
+def _column(values, column):
+    """Build one column with the compact dtype chosen for it."""
+    if column == 'id':
+        return pd.array(values, dtype="Int64")
+    if column in CATEGORY_COLUMNS:
+        return _strings(values).dictionary_encode().to_pandas()
+    if column in BOOLEAN_COLUMNS:
+        return pd.array(values, dtype="boolean")
+    if column in DATE_COLUMNS:
+        return pd.to_datetime(pd.Series(_strings(values), dtype=STRING_DTYPE), format="%Y-%m-%d", errors="coerce")
+    if column in TIMESTAMP_COLUMNS:
+        return pd.to_datetime(pd.Series(_strings(values), dtype=STRING_DTYPE), format="ISO8601", utc=True, errors="coerce")
+    return pd.arrays.ArrowStringArray(pa.chunked_array([_strings(values)]))
+
+def appointments_frame(rows):
+    """
+    Build the admin DataFrame column by column with compact dtypes.
+
+    Known appointment columns come first, in COLUMN_ORDER, followed by any
+    other columns found in any row. Legacy column names are mapped to current
+    ones; rows missing a column (e.g. archived rows next to table rows) get None.
+
+    Args:
+        rows: List of row dicts as returned by PostgREST
+
+    Returns:
+        pd.DataFrame: One row per appointment
+    """
+    if not rows:
+        return pd.DataFrame()
+    # Rows don't all have the same keys, so collect the source keys of each column across all of them
+    present = {}
+    for key in dict.fromkeys(key for row in rows for key in row):
+        present.setdefault(LEGACY_COLUMNS.get(key, key), []).append(key)
+    ordered = [column for column in COLUMN_ORDER if column in present]
+    ordered += [column for column in present if column not in ordered]
+    data = {}
+    for column in ordered:
+        sources = present[column]
+        if len(sources) == 1:
+            values = [row.get(sources[0]) for row in rows]
+        else:
+            values = [next((row[key] for key in sources if row.get(key) is not None), None) for row in rows]
+        data[column] = _column(values, column)
+    return pd.DataFrame(data, copy=False)
@@ -0,0 +1,113 @@
+import hmac
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from dotenv import load_dotenv
+from utils import storage, warmup, models
+from utils.calendar_feed import CalendarFeed, FEED_COLUMNS
+from utils.db_connection import get_appointments_table
+
+# Load environment variables
+load_dotenv()
+
+# Side server for endpoints Streamlit can't serve itself (the calendar feed and readiness probe)
+HTTP_ENDPOINTS_HOST = os.getenv("HTTP_ENDPOINTS_HOST", "0.0.0.0")
+HTTP_ENDPOINTS_PORT = int(os.getenv("HTTP_ENDPOINTS_PORT", "8502"))
+
+# Secret token required to subscribe to the calendar feed; the feed is disabled without it
+CALENDAR_FEED_TOKEN = os.getenv("CALENDAR_FEED_TOKEN")
+
+# PostgREST caps responses at 1000 rows by default, so the feed is loaded in pages
+PAGE_SIZE = 1000
+
+def _load_feed_rows():
+    """Fetch the columns rendered in the calendar feed, page by page."""
+    rows = []
+    start = 0
+    while True:
+        result = get_appointments_table().select(FEED_COLUMNS).order('id').range(start, start + PAGE_SIZE - 1).execute()
+        rows.extend(result.data)
+        if len(result.data) < PAGE_SIZE:
+            return rows
+        start += PAGE_SIZE
+
+calendar_feed = CalendarFeed(_load_feed_rows)
+storage.add_change_listener(calendar_feed.apply_change, remote=True)
+
+class EndpointHandler(BaseHTTPRequestHandler):
+    """Request handler serving the calendar feed and the readiness probe."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/calendar.ics":
+            self._serve_calendar(parse_qs(url.query))
+        elif url.path == "/ready":
+            self._serve_ready()
+        else:
+            self._send_empty(404)
+
+    def _send_empty(self, status, headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _serve_calendar(self, query):
+        token = query.get("token", [""])[0]
+        if not CALENDAR_FEED_TOKEN or not hmac.compare_digest(token, CALENDAR_FEED_TOKEN):
+            self._send_empty(403)
+            return
+
+        etag, chunks = calendar_feed.snapshot()
+        if self.headers.get("If-None-Match") == etag:
+            self._send_empty(304, {"ETag": etag})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/calendar; charset=utf-8")
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "private, max-age=0, must-revalidate")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for chunk in chunks:
+            self.wfile.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _serve_ready(self):
+        # 503 until warm-up has finished, so load balancers hold traffic back
+        body = models.dumps(warmup.status())
+        self.send_response(200 if warmup.is_ready() else 503)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Cache-Control", "no-store")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_request(self, code="-", size="-"):
+        # Calendar apps and load balancers poll every few seconds to minutes, so don't log every request
+        pass
+
+_server = None
+_server_started = False
+_server_lock = threading.Lock()
+
+def start_server():
+    """Start the endpoint server in a background thread, once per process."""
+    global _server, _server_started
+    with _server_lock:
+        if _server_started:
+            return _server
+        _server_started = True
+        try:
+            _server = ThreadingHTTPServer((HTTP_ENDPOINTS_HOST, HTTP_ENDPOINTS_PORT), EndpointHandler)
+        except OSError as e:
+            # Another process on this host already serves the endpoints
+            print(f"Could not start HTTP endpoints on port {HTTP_ENDPOINTS_PORT}: {e}")
+            return None
+        threading.Thread(target=_server.serve_forever, name="http-endpoints", daemon=True).start()
+        print(f"Serving HTTP endpoints on {HTTP_ENDPOINTS_HOST}:{HTTP_ENDPOINTS_PORT}")
+        return _server
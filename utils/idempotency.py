@@ -0,0 +1,74 @@
+import hashlib
+import json
+import uuid
+from utils import shared_state
+from utils.cache import LRUCache
+
+# Submission keys remembered in memory; older ones are still found through the unique DB column
+IDEMPOTENCY_CACHE_SIZE = 10_000
+IDEMPOTENCY_TTL_SECONDS = 24 * 3600
+# A submission being saved holds a claim on its key for at most this long, covering slow uploads
+CLAIM_TTL_SECONDS = 300
+
+_recent_submissions = LRUCache(maxsize=IDEMPOTENCY_CACHE_SIZE, ttl=IDEMPOTENCY_TTL_SECONDS)
+
+def submission_key(form_key, fields, files=()):
+    """
+    Derive an idempotency key for a form submission.
+
+    Args:
+        form_key: The form key from session state, unique per form instance
+        fields: Dict of the submitted form values (must be JSON serializable)
+        files: Uploaded file objects; None entries are ignored
+
+    Returns:
+        str: Hex digest identifying this exact submission
+    """
+    digest = hashlib.sha256()
+    digest.update(str(form_key).encode())
+    digest.update(json.dumps(fields, sort_keys=True, default=str).encode())
+    for file_object in files:
+        if file_object is None or not hasattr(file_object, 'getbuffer'):
+            continue
+        digest.update(file_object.name.encode())
+        # Hash the buffer in place instead of copying it with getvalue()
+        digest.update(file_object.getbuffer())
+    return digest.hexdigest()
+
+def lookup(key, find_in_database=None):
+    """
+    Return the appointment ID already created for key, or None.
+
+    Args:
+        key: Idempotency key from submission_key
+        find_in_database: Optional function looking the key up in the database
+            when it is not in memory (e.g. after a restart or in another process)
+    """
+    appointment_id = _recent_submissions.get(key)
+    if appointment_id is None and find_in_database is not None:
+        appointment_id = find_in_database(key)
+        if appointment_id is not None:
+            _recent_submissions.put(key, appointment_id)
+    return appointment_id
+
+def record(key, appointment_id):
+    """Remember the appointment ID created for key."""
+    _recent_submissions.put(key, appointment_id)
+
+def claim(key):
+    """
+    Claim key while its submission is saved and its files uploaded, across every process sharing state.
+
+    Returns:
+        str: Claim token to pass to release, or None if another submit of the same data holds the claim
+    """
+    token = uuid.uuid4().hex
+    if shared_state.get_store().acquire_lease(f"idempotency:claim:{key}", token, CLAIM_TTL_SECONDS):
+        return token
+    return None
+
+def release(key, token):
+    """Release a claim taken with claim, unless it already expired and was taken over."""
+    store = shared_state.get_store()
+    if store.get(f"idempotency:claim:{key}") == token:
+        store.delete(f"idempotency:claim:{key}")
@@ -0,0 +1,164 @@
+import asyncio
+import io
+import multiprocessing
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dotenv import load_dotenv
+from PIL import Image, ImageOps
+
+# Load environment variables
+load_dotenv()
+
+# Re-encode uploaded images and videos before they are stored (disabled by default)
+MEDIA_COMPRESSION = os.getenv("MEDIA_COMPRESSION", "false").lower() == "true"
+# Target format for still and animated images: "webp" or "avif" (needs Pillow AVIF support)
+MEDIA_IMAGE_FORMAT = os.getenv("MEDIA_IMAGE_FORMAT", "webp").lower()
+MEDIA_IMAGE_QUALITY = int(os.getenv("MEDIA_IMAGE_QUALITY", "80"))
+# Longest side of a stored image, in pixels
+MEDIA_MAX_DIMENSION = int(os.getenv("MEDIA_MAX_DIMENSION", "2048"))
+# Videos larger than this are transcoded with ffmpeg, when it is installed
+MEDIA_MAX_VIDEO_MB = float(os.getenv("MEDIA_MAX_VIDEO_MB", "8"))
+MEDIA_WORKERS = int(os.getenv("MEDIA_WORKERS", "2"))
+
+# Longest side of the image previews shown on the booking form, in pixels
+PREVIEW_MAX_DIMENSION = 800
+
+IMAGE_CONTENT_TYPES = {"image/jpeg", "image/png", "image/gif", "image/webp"}
+VIDEO_CONTENT_TYPES = {"video/mp4"}
+
+def _settings():
+    """Return the settings passed to worker processes."""
+    return {
+        'image_format': MEDIA_IMAGE_FORMAT,
+        'quality': MEDIA_IMAGE_QUALITY,
+        'max_dimension': MEDIA_MAX_DIMENSION,
+        'max_video_bytes': int(MEDIA_MAX_VIDEO_MB * 1024 * 1024),
+    }
+
+def _replace_extension(file_name, extension):
+    return f"{os.path.splitext(file_name)[0]}.{extension}"
+
+def _compress_image(content, file_name, settings):
+    image = Image.open(io.BytesIO(content))
+    image_format = settings['image_format']
+    if image_format == "avif" and "AVIF" not in Image.SAVE:
+        image_format = "webp"
+
+    animated = getattr(image, "is_animated", False)
+    if animated:
+        # Re-encode every frame of an animated GIF as an animated WebP
+        frames = []
+        durations = []
+        for index in range(image.n_frames):
+            image.seek(index)
+            frame = image.convert("RGBA")
+            frame.thumbnail((settings['max_dimension'], settings['max_dimension']))
+            frames.append(frame)
+            durations.append(image.info.get("duration", 100))
+        output = io.BytesIO()
+        frames[0].save(output, format="WEBP", save_all=True, append_images=frames[1:], duration=durations,
+                       loop=image.info.get("loop", 0), quality=settings['quality'])
+        return output.getvalue(), _replace_extension(file_name, "webp"), "image/webp"
+
+    # Apply the EXIF orientation before the metadata is dropped
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((settings['max_dimension'], settings['max_dimension']))
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+    output = io.BytesIO()
+    # No exif= argument, so EXIF (including GPS location) is not written
+    image.save(output, format=image_format.upper(), quality=settings['quality'])
+    return output.getvalue(), _replace_extension(file_name, image_format), f"image/{image_format}"
+
+def preview(content):
+    """
+    Return a downscaled WebP copy of a still image for previewing, or the content unchanged if it is small or animated.
+
+    Returns None if the image can't be decoded (e.g. truncated or not really an image), so no preview is shown.
+    """
+    try:
+        image = Image.open(io.BytesIO(content))
+        if getattr(image, "is_animated", False) or max(image.size) <= PREVIEW_MAX_DIMENSION:
+            return content
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA")
+        image.thumbnail((PREVIEW_MAX_DIMENSION, PREVIEW_MAX_DIMENSION))
+        output = io.BytesIO()
+        image.save(output, format="WEBP", quality=MEDIA_IMAGE_QUALITY)
+        return output.getvalue()
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        print(f"Error previewing image: {e}")
+        return None
+
+def _compress_video(content, file_name, settings):
+    if len(content) <= settings['max_video_bytes'] or shutil.which("ffmpeg") is None:
+        return content, file_name, "video/mp4"
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "source.mp4")
+        target = os.path.join(directory, "target.mp4")
+        with open(source, "wb") as f:
+            f.write(content)
+        max_dimension = settings['max_dimension']
+        subprocess.run(
+            ["ffmpeg", "-y", "-loglevel", "error", "-i", source,
+             "-vf", f"scale='min({max_dimension},iw)':-2", "-map_metadata", "-1",
+             "-c:v", "libx264", "-crf", "28", "-preset", "veryfast", "-c:a", "aac", "-b:a", "96k",
+             "-movflags", "+faststart", target],
+            check=True, timeout=300
+        )
+        with open(target, "rb") as f:
+            return f.read(), file_name, "video/mp4"
+
+def compress(content, file_name, content_type, settings=None):
+    """
+    Compress an uploaded image or video.
+
+    Runs in a worker process. Any failure, or a result that isn't smaller,
+    returns the original content unchanged.
+
+    Returns:
+        tuple: (content, file_name, content_type, bytes_saved)
+    """
+    settings = settings or _settings()
+    try:
+        if content_type in IMAGE_CONTENT_TYPES:
+            result = _compress_image(content, file_name, settings)
+        elif content_type in VIDEO_CONTENT_TYPES:
+            result = _compress_video(content, file_name, settings)
+        else:
+            return content, file_name, content_type, 0
+    except Exception as e:
+        print(f"Error compressing {file_name}, uploading the original: {e}")
+        return content, file_name, content_type, 0
+    if len(result[0]) >= len(content):
+        return content, file_name, content_type, 0
+    return result + (len(content) - len(result[0]),)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _get_pool():
+    """Start the process pool on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Forking a process that runs Streamlit's threads is unsafe, so spawn fresh workers
+            _pool = ProcessPoolExecutor(max_workers=MEDIA_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+async def compress_async(content, file_name, content_type):
+    """Compress in the process pool without blocking the event loop; a no-op unless MEDIA_COMPRESSION is set."""
+    if not MEDIA_COMPRESSION or content_type not in IMAGE_CONTENT_TYPES | VIDEO_CONTENT_TYPES:
+        return content, file_name, content_type, 0
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(_get_pool(), compress, content, file_name, content_type, _settings())
+    except Exception as e:
+        # e.g. a worker process crashed
+        print(f"Error compressing {file_name}, uploading the original: {e}")
+        return content, file_name, content_type, 0
@@ -0,0 +1,81 @@
+import json
+from dataclasses import dataclass, fields, MISSING
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+@dataclass(frozen=True, slots=True)
+class Appointment:
+    """An appointment as stored in the `appointments` table."""
+
+    name: str
+    email: str
+    phone: str
+    appointment_type: str
+    appointment_date: str
+    appointment_time: str
+    reason: str
+    notes: str = ""
+    is_intern: bool = False
+    status: str = "pending"
+    file_uploaded: bool = False
+    file_name: str = None
+    file_url: str = None
+    thirst_trap_uploaded: bool = False
+    thirst_trap_filename: str = None
+    thirst_trap_url: str = None
+    idempotency_key: str = None
+    created_at: str = None
+    id: int = None
+
+# Column names used by older versions of utils/storage.py and data/appointments.csv
+LEGACY_COLUMNS = {
+    'file_path': 'file_url',
+    'thirst_trap_path': 'thirst_trap_url',
+}
+
+APPOINTMENT_FIELDS = tuple(field.name for field in fields(Appointment))
+_DEFAULTS = {field.name: None if field.default is MISSING else field.default for field in fields(Appointment)}
+_FIELD_SET = frozenset(APPOINTMENT_FIELDS)
+
+def from_row(row):
+    """Build an Appointment from a database row, accepting legacy column names and ignoring unknown ones."""
+    if not _FIELD_SET.issuperset(row):
+        row = {LEGACY_COLUMNS.get(key, key): value for key, value in row.items()}
+    get = row.get
+    return Appointment(*[get(name, _DEFAULTS[name]) for name in APPOINTMENT_FIELDS])
+
+def to_row(appointment):
+    """Convert an Appointment to a row for inserting, leaving out unset (None) columns."""
+    values = [getattr(appointment, name) for name in APPOINTMENT_FIELDS]
+    return {name: value for name, value in zip(APPOINTMENT_FIELDS, values) if value is not None}
+
+def dumps(data):
+    """Serialize rows or Appointments to JSON bytes, with orjson when it is installed."""
+    if isinstance(data, Appointment):
+        data = to_row(data)
+    elif isinstance(data, list):
+        data = [to_row(item) if isinstance(item, Appointment) else item for item in data]
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data).encode()
+
+def loads(content):
+    """Parse JSON bytes, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+@dataclass(frozen=True, slots=True)
+class ConfirmationRecord:
+    """The few fields shown on the confirmation page, kept in session state after a booking."""
+
+    appointment_id: int
+    name: str
+    appointment_date: str
+    appointment_time: str
+    appointment_type: str
+    file_name: str = ""
+    is_intern: bool = False
+    thirst_trap_uploaded: bool = False
@@ -0,0 +1,166 @@
+import io
+import os
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+import cProfile
+from dotenv import load_dotenv
+try:
+    from pyinstrument import Profiler as InstrumentProfiler
+except ImportError:
+    InstrumentProfiler = None
+
+# Load environment variables
+load_dotenv()
+
+# Time every rerun in every session; otherwise only sessions opened with ?profile=1
+PROFILE_RERUNS = os.getenv("PROFILE_RERUNS", "false").lower() == "true"
+# Capture a trace of reruns slower than PROFILE_SLOW_MS: "cprofile", "pyinstrument" or unset
+PROFILE_CAPTURE = os.getenv("PROFILE_CAPTURE", "").lower()
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "1000"))
+
+# Samples kept per section for the percentiles, and slow traces kept overall
+MAX_SAMPLES = 1000
+MAX_TRACES = 10
+TRACE_LINES = 40
+
+RERUN_SECTION = "rerun (total)"
+
+_lock = threading.Lock()
+_samples = {}  # section name -> deque of durations in ms, shared by all sessions
+_traces = deque(maxlen=MAX_TRACES)
+_capture_lock = threading.Lock()
+
+# Streamlit runs each session's script on its own thread
+_current = threading.local()
+
+def _record(name, duration_ms):
+    """Add one duration to a section's samples."""
+    with _lock:
+        samples = _samples.get(name)
+        if samples is None:
+            samples = _samples[name] = deque(maxlen=MAX_SAMPLES)
+        samples.append(duration_ms)
+
+def _start_capture():
+    """Start the configured trace profiler, or return None if none is set or another rerun is being traced."""
+    if PROFILE_CAPTURE not in ("cprofile", "pyinstrument"):
+        return None
+    # Only one profiler can be active in the interpreter at a time
+    if not _capture_lock.acquire(blocking=False):
+        return None
+    if PROFILE_CAPTURE == "pyinstrument" and InstrumentProfiler is not None:
+        profiler = InstrumentProfiler()
+        profiler.start()
+    else:
+        profiler = cProfile.Profile()
+        profiler.enable()
+    return profiler
+
+def _stop_capture(profiler):
+    """Stop a trace profiler and return its report as text."""
+    try:
+        if isinstance(profiler, cProfile.Profile):
+            profiler.disable()
+            output = io.StringIO()
+            pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(TRACE_LINES)
+            return output.getvalue()
+        profiler.stop()
+        return profiler.output_text(unicode=True)
+    finally:
+        _capture_lock.release()
+
+def begin_rerun(enabled):
+    """
+    Start timing a rerun of the script on this thread.
+
+    Call once near the top of the script, and end_rerun in a finally block
+    at the end of it; an earlier rerun on this thread that never reached
+    end_rerun is discarded.
+    """
+    previous = getattr(_current, "capture", None)
+    if previous is not None:
+        _stop_capture(previous)
+        _current.capture = None
+    _current.enabled = enabled or PROFILE_RERUNS
+    _current.started = time.perf_counter()
+    _current.capture = _start_capture() if _current.enabled else None
+
+def end_rerun():
+    """Record the total time of the rerun and keep its trace if it was slow."""
+    if not getattr(_current, "enabled", False):
+        return
+    duration_ms = (time.perf_counter() - _current.started) * 1000
+    _record(RERUN_SECTION, duration_ms)
+    if _current.capture is not None:
+        trace = _stop_capture(_current.capture)
+        _current.capture = None
+        if duration_ms >= PROFILE_SLOW_MS:
+            with _lock:
+                _traces.append((time.time(), duration_ms, trace))
+    _current.enabled = False
+
+@contextmanager
+def section(name):
+    """Time a named section of the current rerun; does nothing when profiling is off."""
+    if not getattr(_current, "enabled", False):
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(name, (time.perf_counter() - started) * 1000)
+
+@contextmanager
+def fragment(name, enabled):
+    """
+    Time a Streamlit fragment.
+
+    During a full rerun it is timed as a section of that rerun; when only the
+    fragment reruns it is recorded as its own "<name> (fragment rerun)".
+    """
+    if getattr(_current, "enabled", False):
+        with section(name):
+            yield
+        return
+    if not (enabled or PROFILE_RERUNS):
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(f"{name} (fragment rerun)", (time.perf_counter() - started) * 1000)
+
+def _percentile(ordered, fraction):
+    """Return the nearest-rank percentile of sorted values."""
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def stats():
+    """Return {section: {count, p50, p95, p99, max}} in ms across all sessions, slowest p95 first."""
+    with _lock:
+        samples = {name: sorted(values) for name, values in _samples.items()}
+    result = {}
+    for name, ordered in samples.items():
+        result[name] = {
+            "count": len(ordered),
+            "p50": _percentile(ordered, 0.50),
+            "p95": _percentile(ordered, 0.95),
+            "p99": _percentile(ordered, 0.99),
+            "max": ordered[-1]
+        }
+    return dict(sorted(result.items(), key=lambda item: item[1]["p95"], reverse=True))
+
+def slow_traces():
+    """Return (timestamp, duration in ms, trace text) of the latest slow reruns, newest first."""
+    with _lock:
+        return list(reversed(_traces))
+
+def reset():
+    """Drop all collected samples and traces."""
+    with _lock:
+        _samples.clear()
+        _traces.clear()
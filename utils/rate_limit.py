@@ -0,0 +1,167 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, Counter
+from dotenv import load_dotenv
+from utils import shared_state
+
+# Load environment variables
+load_dotenv()
+
+# Each client may submit a burst of RATE_LIMIT_BURST bookings, refilled at RATE_LIMIT_PER_HOUR
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "3"))
+RATE_LIMIT_PER_HOUR = float(os.getenv("RATE_LIMIT_PER_HOUR", "10"))
+# Maximum number of clients tracked in memory; the least recently seen are evicted first
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "10000"))
+# Optional SQLite file shared by all processes on the host; defaults to the shared
+# state file if there is one, and to memory otherwise
+RATE_LIMIT_DB_PATH = os.getenv("RATE_LIMIT_DB_PATH") or shared_state.SHARED_STATE_DB_PATH
+
+# Identifiers checked for every booking
+SUBMISSION_IDENTIFIERS = ('email', 'phone', 'ip')
+
+class MemoryBucketStore:
+    """Token buckets held in a bounded LRU dict, local to this process."""
+
+    def __init__(self, max_keys=RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def take_all(self, keys, capacity, refill_per_second, now):
+        """
+        Take one token from each bucket of keys, only if every one of them has a token.
+
+        Returns:
+            int: Index of the first key without a token, or None if the tokens were taken
+        """
+        with self._lock:
+            buckets = []
+            for key in keys:
+                tokens, updated_at = self._buckets.pop(key, (capacity, now))
+                buckets.append(min(capacity, tokens + (now - updated_at) * refill_per_second))
+            rejected = next((index for index, tokens in enumerate(buckets) if tokens < 1), None)
+            for key, tokens in zip(keys, buckets):
+                self._buckets[key] = (tokens - 1 if rejected is None else tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return rejected
+
+class SQLiteBucketStore:
+    """Token buckets in a SQLite file, shared by every process on the host."""
+
+    def __init__(self, path, max_keys=RATE_LIMIT_MAX_KEYS):
+        self.path = path
+        self.max_keys = max_keys
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL, updated_at REAL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS buckets_updated_at ON buckets (updated_at)")
+
+    def _connection(self):
+        # sqlite3 connections can't be shared between threads
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
+
+    def take_all(self, keys, capacity, refill_per_second, now):
+        """
+        Take one token from each bucket of keys, only if every one of them has a token.
+
+        Returns:
+            int: Index of the first key without a token, or None if the tokens were taken
+        """
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            buckets = []
+            new_keys = False
+            for key in keys:
+                row = connection.execute("SELECT tokens, updated_at FROM buckets WHERE key = ?", (key,)).fetchone()
+                tokens, updated_at = row if row else (capacity, now)
+                new_keys = new_keys or row is None
+                buckets.append(min(capacity, tokens + (now - updated_at) * refill_per_second))
+            rejected = next((index for index, tokens in enumerate(buckets) if tokens < 1), None)
+            connection.executemany(
+                "INSERT OR REPLACE INTO buckets VALUES (?, ?, ?)",
+                [(key, tokens - 1 if rejected is None else tokens, now) for key, tokens in zip(keys, buckets)]
+            )
+            if new_keys:
+                # Bound the table like the in-memory LRU, dropping the least recently seen keys
+                connection.execute(
+                    "DELETE FROM buckets WHERE key IN "
+                    "(SELECT key FROM buckets ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_keys,)
+                )
+            connection.execute("COMMIT")
+            return rejected
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+class RateLimiter:
+    """Token-bucket rate limiter keyed by any number of client identifiers."""
+
+    def __init__(self, store, burst=RATE_LIMIT_BURST, per_hour=RATE_LIMIT_PER_HOUR, clock=time.time, counters=None):
+        self.store = store
+        self.burst = burst
+        self.refill_per_second = per_hour / 3600
+        self.clock = clock
+        # Allowed/rejected counters, shared between processes when the state store is
+        self.counters = counters or shared_state.MemoryStateStore()
+        self._kinds = set()  # identifier kinds seen, for the rejection breakdown
+
+    def check(self, **identifiers):
+        """
+        Take a token for every non-empty identifier, e.g. check(email=..., ip=...).
+
+        Tokens are only taken if every identifier is within its limit, so a
+        rejection doesn't use up the other identifiers' quota.
+
+        Returns:
+            tuple: (allowed, name of the first identifier that is over its limit or None)
+        """
+        self._kinds.update(identifiers)
+        kinds = [kind for kind, value in identifiers.items() if value]
+        keys = [f"{kind}:{str(identifiers[kind]).strip().lower()}" for kind in kinds]
+        rejected = self.store.take_all(keys, self.burst, self.refill_per_second, self.clock()) if keys else None
+        if rejected is not None:
+            self.counters.incr(f"rate_limit:rejected:{kinds[rejected]}")
+            return False, kinds[rejected]
+        self.counters.incr("rate_limit:allowed")
+        return True, None
+
+    def stats(self):
+        """Return allowed and rejected counts, with rejections broken down by identifier."""
+        rejected = Counter()
+        for kind in self._kinds.union(SUBMISSION_IDENTIFIERS):
+            count = self.counters.get(f"rate_limit:rejected:{kind}", 0)
+            if count:
+                rejected[kind] = count
+        return {
+            'allowed': self.counters.get("rate_limit:allowed", 0),
+            'rejected': sum(rejected.values()),
+            'rejected_by': dict(rejected)
+        }
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+def get_limiter():
+    """Return the process-wide submission rate limiter."""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            store = SQLiteBucketStore(RATE_LIMIT_DB_PATH) if RATE_LIMIT_DB_PATH else MemoryBucketStore()
+            _limiter = RateLimiter(store, counters=shared_state.get_store())
+    return _limiter
+
+def check_submission(email, phone, ip=None):
+    """Check whether a booking from this email, phone and client IP is within the limits."""
+    return get_limiter().check(**dict(zip(SUBMISSION_IDENTIFIERS, (email, phone, ip))))
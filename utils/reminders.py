@@ -0,0 +1,258 @@
+import heapq
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+from dotenv import load_dotenv
+from utils import shared_state
+
+# Load environment variables
+load_dotenv()
+
+# How long before an appointment its reminder is sent
+REMINDER_LEAD_HOURS = float(os.getenv("REMINDER_LEAD_HOURS", "24"))
+# How often the background thread checks for due reminders
+REMINDER_TICK_SECONDS = float(os.getenv("REMINDER_TICK_SECONDS", "30"))
+# Where pending and sent reminders are checkpointed across restarts
+REMINDER_CHECKPOINT_PATH = os.getenv("REMINDER_CHECKPOINT_PATH", os.path.join("data", "reminders_checkpoint.json"))
+# Minimum seconds between checkpoints caused by schedule changes (sent reminders are saved right away)
+CHECKPOINT_INTERVAL_SECONDS = 60
+# Only the process holding this shared state lease sends reminders and writes the checkpoint
+REMINDER_LEASE_KEY = "reminders:leader"
+# A leader that stops renewing (e.g. it crashed) is replaced after this long
+REMINDER_LEASE_SECONDS = max(60.0, 3 * REMINDER_TICK_SECONDS)
+
+# Appointments in these statuses don't get reminders
+SKIPPED_STATUSES = {'rejected', 'cancelled'}
+
+# Row fields kept for each pending reminder
+REMINDER_FIELDS = ('id', 'name', 'email', 'appointment_type', 'appointment_date', 'appointment_time', 'status')
+
+def appointment_start(row):
+    """Return the start of an appointment as a POSIX timestamp, or None if it can't be parsed."""
+    try:
+        start = datetime.strptime(f"{row['appointment_date']} {row['appointment_time']}", "%Y-%m-%d %H:%M")
+    except (KeyError, TypeError, ValueError):
+        return None
+    return start.timestamp()
+
+class ReminderScheduler:
+    """Heap-based scheduler firing one reminder per upcoming appointment.
+
+    Reminders are keyed by their fire time in a min-heap. Rescheduling or
+    cancelling bumps a per-appointment version instead of searching the heap,
+    and stale heap entries are skipped when popped, so a tick only costs
+    O(k log n) for the k reminders that are due and O(1) when none are.
+    The clock is injectable so tests can simulate time. With holds_lease,
+    the checkpoint is only written while holds_lease() is True, so a leader
+    that lost its lease can't overwrite its successor's checkpoint.
+    """
+
+    def __init__(self, sender, lead_seconds=REMINDER_LEAD_HOURS * 3600, clock=time.time,
+                 checkpoint_path=None, owner=None, holds_lease=None):
+        self.sender = sender
+        self.lead_seconds = lead_seconds
+        self.clock = clock
+        self.checkpoint_path = checkpoint_path
+        self.owner = owner
+        self.holds_lease = holds_lease
+        self._lock = threading.RLock()
+        self._heap = []  # (fire_at, appointment id, version)
+        self._pending = {}  # appointment id -> (version, fire_at, row)
+        self._sent = {}  # appointment id -> fire time of the reminder already sent
+        self._version = 0
+        self._dirty = False
+        self._last_checkpoint = 0.0
+        self.fired = 0
+        self.failed = 0
+        if checkpoint_path:
+            self._restore()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def schedule(self, row):
+        """Schedule (or reschedule) the reminder of an appointment row."""
+        appointment_id = row.get('id')
+        if appointment_id is None:
+            return
+        with self._lock:
+            previous = self._pending.get(appointment_id)
+            if previous is not None:
+                # Partial updates only carry the changed columns
+                row = {**previous[2], **row}
+            start = appointment_start(row)
+            if start is None or row.get('status') in SKIPPED_STATUSES or start <= self.clock():
+                self._cancel(appointment_id)
+                return
+            fire_at = start - self.lead_seconds
+            if self._sent.get(appointment_id) == fire_at:
+                # Already reminded about this exact slot
+                return
+            if previous is not None and previous[1] == fire_at:
+                self._pending[appointment_id] = (previous[0], fire_at, self._compact_row(row))
+                return
+            self._version += 1
+            self._pending[appointment_id] = (self._version, fire_at, self._compact_row(row))
+            heapq.heappush(self._heap, (fire_at, appointment_id, self._version))
+            self._dirty = True
+
+    def schedule_many(self, rows):
+        """Schedule reminders for many rows, e.g. all upcoming appointments after a restart."""
+        with self._lock:
+            for row in rows:
+                self.schedule(row)
+
+    def cancel(self, appointment_id):
+        """Cancel the pending reminder of an appointment."""
+        with self._lock:
+            self._cancel(appointment_id)
+
+    def _cancel(self, appointment_id):
+        if self._pending.pop(appointment_id, None) is not None:
+            self._dirty = True
+            # Rebuild once stale entries outnumber live ones, so the heap stays O(pending)
+            if len(self._heap) > 2 * len(self._pending) + 64:
+                self._heap = [(fire_at, key, version) for key, (version, fire_at, _) in self._pending.items()]
+                heapq.heapify(self._heap)
+
+    def apply_change(self, event, row):
+        """Change listener keeping reminders in sync with new bookings and status changes."""
+        self.schedule(row)
+
+    @staticmethod
+    def _compact_row(row):
+        return {field: row.get(field) for field in REMINDER_FIELDS}
+
+    def tick(self):
+        """Send every reminder that is due and return how many were sent."""
+        now = self.clock()
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                fire_at, appointment_id, version = heapq.heappop(self._heap)
+                pending = self._pending.get(appointment_id)
+                if pending is None or pending[0] != version:
+                    # Cancelled or rescheduled since it was pushed
+                    continue
+                del self._pending[appointment_id]
+                self._sent[appointment_id] = fire_at
+                due.append(pending[2])
+            if due:
+                self._dirty = True
+
+        sent = 0
+        for row in due:
+            try:
+                self.sender(row)
+                sent += 1
+            except Exception as e:
+                print(f"Error sending reminder for appointment {row.get('id')}: {e}")
+                self.failed += 1
+        self.fired += sent
+
+        if self.checkpoint_path and self._dirty and (due or now - self._last_checkpoint >= CHECKPOINT_INTERVAL_SECONDS):
+            self.checkpoint()
+        return sent
+
+    def checkpoint(self):
+        """Write pending and recently sent reminders to the checkpoint file, if this scheduler still owns it."""
+        if self.holds_lease is not None and not self.holds_lease():
+            print("Not writing the reminder checkpoint: another process holds the reminder lease")
+            return
+        with self._lock:
+            now = self.clock()
+            # Forget sent reminders once their appointment is over
+            self._sent = {key: fire_at for key, fire_at in self._sent.items()
+                          if fire_at + self.lead_seconds > now}
+            state = {
+                'owner': self.owner,
+                'pending': [row for _, _, row in self._pending.values()],
+                'sent': [[key, fire_at] for key, fire_at in self._sent.items()]
+            }
+            self._dirty = False
+            self._last_checkpoint = now
+        directory = os.path.dirname(self.checkpoint_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.checkpoint_path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(temp_path, self.checkpoint_path)
+
+    def _restore(self):
+        try:
+            with open(self.checkpoint_path) as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"Error reading reminder checkpoint {self.checkpoint_path}: {e}")
+            return
+        self._sent = {key: fire_at for key, fire_at in state.get('sent', [])}
+        self.schedule_many(state.get('pending', []))
+
+_scheduler = None  # the running scheduler while this process holds the reminder lease
+_scheduler_lock = threading.Lock()
+_started = False
+# Identifies this process as the lease holder
+_owner = f"{os.getpid()}-{uuid.uuid4().hex}"
+
+def _holds_lease(store):
+    return store.get(REMINDER_LEASE_KEY) == _owner
+
+def _run_while_leader(load_rows, sender, store):
+    """Send reminders while this process holds the lease, and keep trying to take it otherwise."""
+    global _scheduler
+    while True:
+        try:
+            if store.acquire_lease(REMINDER_LEASE_KEY, _owner, REMINDER_LEASE_SECONDS):
+                if _scheduler is None:
+                    # Newly elected: pick up the previous leader's checkpoint, then catch up from storage
+                    scheduler = ReminderScheduler(sender, checkpoint_path=REMINDER_CHECKPOINT_PATH, owner=_owner,
+                                                  holds_lease=lambda: _holds_lease(store))
+                    scheduler.schedule_many(load_rows())
+                    with _scheduler_lock:
+                        _scheduler = scheduler
+                    print("This process now sends appointment reminders")
+                _scheduler.tick()
+            elif _scheduler is not None:
+                with _scheduler_lock:
+                    _scheduler = None
+                print("Another process took over sending appointment reminders")
+        except Exception as e:
+            print(f"Error in reminder scheduler: {e}")
+        time.sleep(REMINDER_TICK_SECONDS)
+
+def apply_change(event, row):
+    """Change listener keeping the leader's reminders in sync; does nothing in other processes."""
+    with _scheduler_lock:
+        scheduler = _scheduler
+    if scheduler is not None:
+        scheduler.apply_change(event, row)
+
+def start_scheduler(load_rows, sender, store=None):
+    """
+    Start sending reminders from whichever process holds the reminder lease.
+
+    Every process runs a background thread competing for the lease in the
+    shared state store; only the holder keeps a schedule, sends reminders and
+    writes the checkpoint, so each reminder goes out once however many
+    processes share the store. Register apply_change with remote=True so
+    the leader also follows changes made in other processes.
+
+    Args:
+        load_rows: Function returning upcoming appointment rows, used to catch
+            up on bookings made while no scheduler was running here
+        sender: Function called with the appointment row of each due reminder
+        store: Shared state store holding the lease, shared_state.get_store() by default
+    """
+    global _started
+    with _scheduler_lock:
+        if _started:
+            return
+        _started = True
+    store = store or shared_state.get_store()
+    threading.Thread(target=_run_while_leader, args=(load_rows, sender, store), name="reminders", daemon=True).start()
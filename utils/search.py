@@ -0,0 +1,172 @@
+import re
+import threading
+import heapq
+from bisect import bisect_left
+
+# Fields that are indexed for searching
+SEARCH_FIELDS = ('name', 'email', 'phone', 'reason', 'notes')
+
+# Minimum trigram similarity for a fuzzy match
+FUZZY_THRESHOLD = 0.4
+
+_token_pattern = re.compile(r"\w+")
+
+def tokenize(text):
+    """Split text into lowercase word tokens."""
+    if not text:
+        return []
+    return _token_pattern.findall(str(text).lower())
+
+def row_tokens(row):
+    """Return the set of tokens indexed for an appointment row."""
+    tokens = set()
+    for field in SEARCH_FIELDS:
+        value = row.get(field)
+        if not value:
+            continue
+        tokens.update(tokenize(value))
+        if field == 'email':
+            tokens.add(str(value).lower())
+        elif field == 'phone':
+            # Index the bare digits so "+1 (213) 555" style input still matches
+            digits = re.sub(r"\D", "", str(value))
+            if digits:
+                tokens.add(digits)
+    return tokens
+
+def trigrams(token):
+    """Return the padded character trigrams of a token."""
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class AppointmentIndex:
+    """In-memory inverted index over appointments with prefix and fuzzy matching.
+
+    Rows are added and replaced incrementally, so the index never has to be
+    rebuilt when a new appointment is booked. All methods are thread safe.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._rows = {}  # appointment id -> row
+        self._doc_tokens = {}  # appointment id -> set of tokens
+        self._postings = {}  # token -> set of appointment ids
+        self._sorted_tokens = []  # all tokens, sorted for prefix lookups
+        self._trigrams = {}  # trigram -> set of tokens, for fuzzy lookups
+
+    def __len__(self):
+        return len(self._rows)
+
+    def add(self, row):
+        """Index an appointment row, replacing any previous version with the same id."""
+        with self._lock:
+            self._add(row, keep_sorted=True)
+
+    def add_many(self, rows):
+        """Index many rows at once, sorting the token list a single time at the end."""
+        with self._lock:
+            for row in rows:
+                self._add(row, keep_sorted=False)
+            self._sorted_tokens = sorted(self._postings)
+
+    def _add(self, row, keep_sorted):
+        appointment_id = row.get('id')
+        if appointment_id is None:
+            return
+        previous = self._rows.get(appointment_id)
+        if previous is not None:
+            # Partial updates only carry the changed columns
+            row = {**previous, **row}
+            self._unindex(appointment_id)
+        tokens = row_tokens(row)
+        self._rows[appointment_id] = row
+        self._doc_tokens[appointment_id] = tokens
+        for token in tokens:
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = set()
+                if keep_sorted:
+                    self._sorted_tokens.insert(bisect_left(self._sorted_tokens, token), token)
+                for gram in trigrams(token):
+                    self._trigrams.setdefault(gram, set()).add(token)
+            postings.add(appointment_id)
+
+    def remove(self, appointment_id):
+        """Drop an appointment from the index."""
+        with self._lock:
+            if appointment_id in self._rows:
+                self._unindex(appointment_id)
+                del self._rows[appointment_id]
+
+    def _unindex(self, appointment_id):
+        for token in self._doc_tokens.pop(appointment_id, ()):
+            postings = self._postings[token]
+            postings.discard(appointment_id)
+            if not postings:
+                del self._postings[token]
+                del self._sorted_tokens[bisect_left(self._sorted_tokens, token)]
+                for gram in trigrams(token):
+                    grams = self._trigrams[gram]
+                    grams.discard(token)
+                    if not grams:
+                        del self._trigrams[gram]
+
+    def _prefix_tokens(self, term):
+        """Return all indexed tokens starting with term."""
+        start = bisect_left(self._sorted_tokens, term)
+        tokens = []
+        for token in self._sorted_tokens[start:]:
+            if not token.startswith(term):
+                break
+            tokens.append(token)
+        return tokens
+
+    def _fuzzy_tokens(self, term):
+        """Return indexed tokens whose trigram similarity to term is above FUZZY_THRESHOLD."""
+        term_grams = trigrams(term)
+        shared = {}
+        for gram in term_grams:
+            for token in self._trigrams.get(gram, ()):
+                shared[token] = shared.get(token, 0) + 1
+        tokens = []
+        for token, count in shared.items():
+            similarity = count / (len(term_grams) + len(token) + 1 - count)
+            if similarity >= FUZZY_THRESHOLD:
+                tokens.append(token)
+        return tokens
+
+    def _term_ids(self, term, fuzzy):
+        tokens = self._prefix_tokens(term)
+        if not tokens and fuzzy:
+            tokens = self._fuzzy_tokens(term)
+        if len(tokens) == 1:
+            return self._postings[tokens[0]]
+        ids = set()
+        for token in tokens:
+            ids.update(self._postings[token])
+        return ids
+
+    def search(self, query, page=1, page_size=20, fuzzy=True):
+        """Search appointments matching every term of query.
+
+        Each term matches indexed tokens by prefix, falling back to trigram
+        similarity when fuzzy is set and nothing matches the prefix. Results
+        are ordered newest first.
+
+        Returns:
+            tuple: (total number of matches, list of rows on the requested page)
+        """
+        terms = tokenize(query)
+        if not terms:
+            return 0, []
+        with self._lock:
+            matches = None
+            # Resolve the longest (most selective) terms first so the intersection shrinks early
+            for term in sorted(set(terms), key=len, reverse=True):
+                ids = self._term_ids(term, fuzzy)
+                matches = set(ids) if matches is None else matches & ids
+                if not matches:
+                    return 0, []
+            end = max(page, 1) * page_size
+            newest = heapq.nlargest(end, matches)
+            return len(matches), [self._rows[appointment_id] for appointment_id in newest[end - page_size:end]]
@@ -0,0 +1,53 @@
+import sys
+import threading
+import time
+
+# A session not seen for this long counts as gone (Streamlit doesn't tell the script when a session ends)
+SESSION_EXPIRY_SECONDS = 1800
+
+_lock = threading.Lock()
+_sessions = {}  # session id -> (last rerun time, estimated bytes of its session state)
+
+def estimate_size(obj, _seen=None):
+    """Estimate the memory held by an object, following containers and object attributes."""
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+
+    # Uploaded files are BytesIO subclasses, whose getsizeof already includes the buffer
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(estimate_size(key, _seen) + estimate_size(value, _seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item, _seen) for item in obj)
+    elif hasattr(obj, "__slots__"):
+        size += sum(estimate_size(getattr(obj, slot), _seen) for slot in obj.__slots__ if hasattr(obj, slot))
+    elif hasattr(obj, "__dict__"):
+        size += estimate_size(vars(obj), _seen)
+    return size
+
+def session_state_bytes(session_state):
+    """Return the estimated memory of every value in a Streamlit session state, by key, largest first."""
+    sizes = {key: estimate_size(session_state[key]) for key in list(session_state.keys())}
+    return dict(sorted(sizes.items(), key=lambda item: item[1], reverse=True))
+
+def record_session(session_id, session_state):
+    """Measure a session's state at the end of its rerun and keep the size in the process-wide registry."""
+    size = sum(session_state_bytes(session_state).values())
+    with _lock:
+        _sessions[session_id] = (time.time(), size)
+
+def sessions_summary():
+    """Return the number of recently active sessions in this process and the total and largest size of their state."""
+    cutoff = time.time() - SESSION_EXPIRY_SECONDS
+    with _lock:
+        for session_id in [key for key, (seen, _) in _sessions.items() if seen < cutoff]:
+            del _sessions[session_id]
+        sizes = [size for _, size in _sessions.values()]
+    return {
+        'sessions': len(sizes),
+        'total_bytes': sum(sizes),
+        'largest_bytes': max(sizes, default=0)
+    }
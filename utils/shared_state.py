@@ -0,0 +1,249 @@
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dotenv import load_dotenv
+from utils import models
+
+# Load environment variables
+load_dotenv()
+
+# Optional SQLite file shared by all processes on the host; in-process only when unset
+SHARED_STATE_DB_PATH = os.getenv("SHARED_STATE_DB_PATH")
+# How often other processes' published messages are picked up
+SHARED_STATE_POLL_SECONDS = float(os.getenv("SHARED_STATE_POLL_SECONDS", "0.5"))
+# Published messages are kept this long, long enough for every poller to see them
+MESSAGE_RETENTION_SECONDS = 60
+# How often the poller deletes messages older than MESSAGE_RETENTION_SECONDS
+PRUNE_INTERVAL_SECONDS = 10
+
+class MemoryStateStore:
+    """Key-value store with TTLs and counters, local to this process.
+
+    With a single process there is nobody else to notify, so publish is a
+    no-op and subscribers are never called.
+    """
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self._data = {}  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def _lookup(self, key, now):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= now:
+            del self._data[key]
+            return None
+        return entry
+
+    def get(self, key, default=None):
+        """Return the value stored under key, or default if it is missing or expired."""
+        with self._lock:
+            entry = self._lookup(key, self.clock())
+            return default if entry is None else entry[1]
+
+    def set(self, key, value, ttl=None):
+        """Store value under key, expiring after ttl seconds if given."""
+        with self._lock:
+            self._data[key] = (self.clock() + ttl if ttl else None, value)
+
+    def incr(self, key, amount=1, ttl=None):
+        """Atomically add amount to the counter under key and return the new value.
+
+        A new counter expires after ttl seconds; incrementing does not extend it.
+        """
+        with self._lock:
+            now = self.clock()
+            entry = self._lookup(key, now)
+            expires_at, value = entry if entry else (now + ttl if ttl else None, 0)
+            value += amount
+            self._data[key] = (expires_at, value)
+            return value
+
+    def delete(self, key):
+        """Remove key if present."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def acquire_lease(self, key, owner, ttl):
+        """Take or renew the lease under key for owner; return False while another owner holds it."""
+        with self._lock:
+            now = self.clock()
+            entry = self._lookup(key, now)
+            if entry is not None and entry[1] != owner:
+                return False
+            self._data[key] = (now + ttl, owner)
+            return True
+
+    def publish(self, channel, message):
+        """Send message to subscribers of channel in other processes."""
+
+    def subscribe(self, channel, callback):
+        """Call callback(message) for every message other processes publish on channel."""
+
+class SQLiteStateStore:
+    """Key-value store with TTLs, counters and pub/sub in a SQLite file, shared by every process on the host."""
+
+    def __init__(self, path, poll_seconds=SHARED_STATE_POLL_SECONDS, clock=time.time):
+        self.path = path
+        self.poll_seconds = poll_seconds
+        self.clock = clock
+        self._local = threading.local()
+        self._origin = uuid.uuid4().hex  # messages from this process are not delivered back to it
+        self._subscribers = {}  # channel -> list of callbacks
+        self._subscribers_lock = threading.Lock()
+        self._poller_started = False
+        self._last_seq = 0
+        self._last_prune = 0.0
+        connection = self._connection()
+        connection.execute("CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value BLOB, expires_at REAL)")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS messages "
+            "(seq INTEGER PRIMARY KEY AUTOINCREMENT, channel TEXT, origin TEXT, message BLOB, created_at REAL)"
+        )
+        connection.execute("CREATE INDEX IF NOT EXISTS messages_created_at ON messages (created_at)")
+
+    def _connection(self):
+        # sqlite3 connections can't be shared between threads
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, key, default=None):
+        """Return the value stored under key, or default if it is missing or expired."""
+        row = self._connection().execute(
+            "SELECT value FROM state WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, self.clock())
+        ).fetchone()
+        return default if row is None else models.loads(row[0])
+
+    def set(self, key, value, ttl=None):
+        """Store value under key, expiring after ttl seconds if given."""
+        now = self.clock()
+        connection = self._connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO state VALUES (?, ?, ?)",
+            (key, models.dumps(value), now + ttl if ttl else None)
+        )
+        connection.execute("DELETE FROM state WHERE expires_at <= ?", (now,))
+
+    def incr(self, key, amount=1, ttl=None):
+        """Atomically add amount to the counter under key and return the new value.
+
+        A new counter expires after ttl seconds; incrementing does not extend it.
+        """
+        now = self.clock()
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(
+                "SELECT value, expires_at FROM state WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, now)
+            ).fetchone()
+            value, expires_at = (models.loads(row[0]), row[1]) if row else (0, now + ttl if ttl else None)
+            value += amount
+            connection.execute("INSERT OR REPLACE INTO state VALUES (?, ?, ?)", (key, models.dumps(value), expires_at))
+            connection.execute("COMMIT")
+            return value
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+    def delete(self, key):
+        """Remove key if present."""
+        self._connection().execute("DELETE FROM state WHERE key = ?", (key,))
+
+    def acquire_lease(self, key, owner, ttl):
+        """Take or renew the lease under key for owner; return False while another owner holds it."""
+        now = self.clock()
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(
+                "SELECT value FROM state WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, now)
+            ).fetchone()
+            if row is not None and models.loads(row[0]) != owner:
+                connection.execute("ROLLBACK")
+                return False
+            connection.execute("INSERT OR REPLACE INTO state VALUES (?, ?, ?)", (key, models.dumps(owner), now + ttl))
+            connection.execute("COMMIT")
+            return True
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+    def publish(self, channel, message):
+        """Send message to subscribers of channel in other processes; old messages are pruned by the poller."""
+        self._connection().execute(
+            "INSERT INTO messages (channel, origin, message, created_at) VALUES (?, ?, ?, ?)",
+            (channel, self._origin, models.dumps(message), self.clock())
+        )
+        with self._subscribers_lock:
+            self._start_poller()
+
+    def subscribe(self, channel, callback):
+        """Call callback(message) for every message other processes publish on channel."""
+        with self._subscribers_lock:
+            self._subscribers.setdefault(channel, []).append(callback)
+            self._start_poller()
+
+    def _start_poller(self):
+        # Called with _subscribers_lock held
+        if not self._poller_started:
+            # Only messages published from now on are delivered
+            row = self._connection().execute("SELECT MAX(seq) FROM messages").fetchone()
+            self._last_seq = row[0] or 0
+            threading.Thread(target=self._poll_forever, name="shared-state", daemon=True).start()
+            self._poller_started = True
+
+    def prune(self):
+        """Delete messages older than MESSAGE_RETENTION_SECONDS."""
+        self._connection().execute(
+            "DELETE FROM messages WHERE created_at < ?", (self.clock() - MESSAGE_RETENTION_SECONDS,)
+        )
+
+    def poll(self):
+        """Deliver the messages published by other processes since the last poll."""
+        rows = self._connection().execute(
+            "SELECT seq, channel, message FROM messages WHERE seq > ? AND origin != ? ORDER BY seq",
+            (self._last_seq, self._origin)
+        ).fetchall()
+        for seq, channel, message in rows:
+            self._last_seq = seq
+            with self._subscribers_lock:
+                callbacks = list(self._subscribers.get(channel, ()))
+            for callback in callbacks:
+                try:
+                    callback(models.loads(message))
+                except Exception as e:
+                    print(f"Error in shared state subscriber for {channel}: {e}")
+
+    def _poll_forever(self):
+        while True:
+            try:
+                self.poll()
+                if time.monotonic() - self._last_prune >= PRUNE_INTERVAL_SECONDS:
+                    self._last_prune = time.monotonic()
+                    self.prune()
+            except Exception as e:
+                print(f"Error polling shared state: {e}")
+            time.sleep(self.poll_seconds)
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_store():
+    """Return the process-wide shared state store."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SQLiteStateStore(SHARED_STATE_DB_PATH) if SHARED_STATE_DB_PATH else MemoryStateStore()
+    return _store
@@ -1,6 +1,5 @@
 import os
-import pandas as pd
-from datetime import datetime
+from datetime import datetime, timedelta
 from utils.db_connection import (
     initialize_database,
     get_appointments_table,
@@ -8,7 +7,15 @@ from utils.db_connection import (
     test_connection,
     save_file_to_supabase
 )
+from utils.search import AppointmentIndex, SEARCH_FIELDS
+from utils.cache import LRUCache
+from utils import async_db, archive, shared_state
+from utils.models import from_row, to_row
+from utils.frames import appointments_frame
+from dataclasses import replace
 from dotenv import load_dotenv
+import threading
+import time
 import uuid
 
 # Load environment variables
@@ -18,6 +25,70 @@ load_dotenv()
 UPLOAD_BUCKET = os.getenv("UPLOAD_BUCKET", "uploads")
 THIRST_TRAP_BUCKET = os.getenv("THIRST_TRAP_BUCKET", "thirst_traps")
 
+# PostgREST caps responses at 1000 rows by default, so larger reads are paged
+PAGE_SIZE = 1000
+
+# Read-through cache for single appointment lookups, invalidated on every update
+APPOINTMENT_CACHE_SIZE = int(os.getenv("APPOINTMENT_CACHE_SIZE", "1024"))
+APPOINTMENT_CACHE_TTL_SECONDS = float(os.getenv("APPOINTMENT_CACHE_TTL_SECONDS", "300"))
+_appointment_cache = LRUCache(maxsize=APPOINTMENT_CACHE_SIZE, ttl=APPOINTMENT_CACHE_TTL_SECONDS)
+
+# Callbacks notified after an appointment row is inserted or updated, and the
+# subset also notified of changes made by other processes
+_change_listeners = []
+_remote_change_listeners = []
+
+# Shared state channel relaying change events between processes
+CHANGES_CHANNEL = "appointment_changes"
+
+# Database health is checked at most this often, across all processes sharing state
+HEALTH_CHECK_TTL_SECONDS = float(os.getenv("HEALTH_CHECK_TTL_SECONDS", "30"))
+
+def add_change_listener(callback, remote=False):
+    """
+    Register a callback(event, row) to run after an appointment is inserted or updated.
+    
+    With remote=True the callback also runs for changes made by other processes
+    sharing state, which keeps caches coherent; leave it off for side effects
+    such as confirmation emails that the process making the change performs,
+    and turn it on for work done by a single elected process, like reminders.
+    """
+    if callback not in _change_listeners:
+        _change_listeners.append(callback)
+    if remote and callback not in _remote_change_listeners:
+        _remote_change_listeners.append(callback)
+
+def _call_listeners(listeners, event, row):
+    for callback in list(listeners):
+        try:
+            callback(event, row)
+        except Exception as e:
+            print(f"Error in appointment change listener: {e}")
+
+def notify_change(event, row):
+    """Notify registered listeners that an appointment was inserted ('insert') or updated ('update')."""
+    notify_changes(event, [row])
+
+def notify_changes(event, rows):
+    """Notify listeners of the same event on many appointments, relayed to other processes as one message."""
+    if not rows:
+        return
+    for row in rows:
+        _call_listeners(_change_listeners, event, row)
+    try:
+        shared_state.get_store().publish(CHANGES_CHANNEL, {"event": event, "rows": rows})
+    except Exception as e:
+        print(f"Error publishing appointment changes: {e}")
+
+def _on_remote_change(message):
+    """Apply change events published by another process to the remote listeners."""
+    # Processes started before batching was added publish a single "row"
+    rows = message["rows"] if "rows" in message else [message["row"]]
+    for row in rows:
+        _call_listeners(_remote_change_listeners, message["event"], row)
+
+shared_state.get_store().subscribe(CHANGES_CHANNEL, _on_remote_change)
+
 def initialize_storage():
     """Initialize Supabase tables and storage."""
     # Initialize database
@@ -29,117 +100,195 @@ def initialize_storage():
         return False
 
 def save_appointment(appointment_data):
-    """Save a new appointment to Supabase and handle file uploads."""
+    """
+    Save a new appointment to Supabase and handle file uploads.
+    
+    Args:
+        appointment_data: Dict of appointment fields, optionally with 'uploaded_file'
+            and 'thirst_trap_file' file objects to upload first
+    """
     try:
+        appointment_data = dict(appointment_data)
+        uploaded_file = appointment_data.pop('uploaded_file', None)
+        thirst_trap_file = appointment_data.pop('thirst_trap_file', None)
+        appointment = from_row(appointment_data)
+        
         # Handle file upload if exists
-        if appointment_data.get('file_uploaded', False) and 'uploaded_file' in appointment_data:
-            uploaded_file = appointment_data['uploaded_file']
-            
+        if appointment.file_uploaded and uploaded_file is not None:
             try:
                 # Upload file to Supabase storage
-                file_path = save_file_to_supabase(
+                file_url = save_file_to_supabase(
                     uploaded_file.getvalue(),
                     uploaded_file.name,
                     UPLOAD_BUCKET
                 )
                 
                 # Update file info in appointment data
-                appointment_data['file_name'] = uploaded_file.name
-                appointment_data['file_path'] = file_path
+                appointment = replace(appointment, file_name=uploaded_file.name, file_url=file_url)
             except Exception as e:
                 print(f"Error uploading file to Supabase: {e}")
-                appointment_data['file_uploaded'] = False
-                appointment_data['file_name'] = ''
-                appointment_data['file_path'] = ''
+                appointment = replace(appointment, file_uploaded=False, file_name='', file_url='')
         
         # Handle thirst trap upload for interns
-        if appointment_data.get('is_intern', False) and appointment_data.get('thirst_trap_uploaded', False) and 'thirst_trap_file' in appointment_data:
-            thirst_trap_file = appointment_data['thirst_trap_file']
-            
+        if appointment.is_intern and appointment.thirst_trap_uploaded and thirst_trap_file is not None:
             try:
                 print(f"Attempting to upload thirst trap: {thirst_trap_file.name}")
                 print(f"Uploading to bucket: {THIRST_TRAP_BUCKET}")
                 
                 # Upload thirst trap to Supabase storage
-                thirst_trap_path = save_file_to_supabase(
+                thirst_trap_url = save_file_to_supabase(
                     thirst_trap_file.getvalue(),
                     thirst_trap_file.name,
                     THIRST_TRAP_BUCKET
                 )
                 
-                print(f"Thirst trap uploaded successfully. URL: {thirst_trap_path}")
+                print(f"Thirst trap uploaded successfully. URL: {thirst_trap_url}")
                 
                 # Update thirst trap info in appointment data
-                appointment_data['thirst_trap_filename'] = thirst_trap_file.name
-                appointment_data['thirst_trap_path'] = thirst_trap_path
+                appointment = replace(appointment, thirst_trap_filename=thirst_trap_file.name, thirst_trap_url=thirst_trap_url)
             except Exception as e:
                 error_message = f"Error uploading thirst trap to Supabase: {e}"
                 print(error_message)
                 import traceback
                 traceback.print_exc()
-                appointment_data['thirst_trap_uploaded'] = False
-                appointment_data['thirst_trap_filename'] = ''
-                appointment_data['thirst_trap_path'] = ''
                 raise Exception(error_message)
         
-        # Remove the file objects before saving to database (they can't be serialized)
-        if 'uploaded_file' in appointment_data:
-            del appointment_data['uploaded_file']
-        if 'thirst_trap_file' in appointment_data:
-            del appointment_data['thirst_trap_file']
-        
-        # Add created_at and status if not present
-        if 'created_at' not in appointment_data:
-            appointment_data['created_at'] = datetime.now().isoformat()
-        if 'status' not in appointment_data:
-            appointment_data['status'] = 'pending'
+        # Add created_at if not present
+        if appointment.created_at is None:
+            appointment = replace(appointment, created_at=datetime.now().isoformat())
             
         # Add a unique ID if not present - using timestamp instead of UUID for bigint compatibility
-        if 'id' not in appointment_data:
+        if appointment.id is None:
             # Use timestamp as integer ID instead of UUID since the column is bigint
-            appointment_data['id'] = int(datetime.now().timestamp() * 1000)  # milliseconds for uniqueness
+            appointment = replace(appointment, id=int(datetime.now().timestamp() * 1000))  # milliseconds for uniqueness
         
         # Insert into Supabase
-        result = get_appointments_table().insert(appointment_data).execute()
+        result = get_appointments_table().insert(to_row(appointment)).execute()
         
         # Get the ID of the newly created appointment
-        appointment_id = appointment_data['id']
+        appointment_id = appointment.id
+        notify_change('insert', result.data[0] if result.data else to_row(appointment))
         
         return True, appointment_id
     except Exception as e:
         return False, str(e)
 
-def get_all_appointments():
-    """Retrieve all appointments from Supabase."""
+async def _select_all_appointments(columns='*'):
+    """Fetch every appointment, one page per request, in id order."""
+    return await async_db.select_all_rows("appointments", columns, page_size=PAGE_SIZE)
+
+def get_all_appointments(include_archived=False):
+    """Retrieve all appointments from Supabase, optionally followed by the archived ones."""
     try:
-        # Query all appointments
-        result = get_appointments_table().select('*').execute()
+        # Query all appointments page by page on the shared event loop
+        appointments_data = async_db.run(_select_all_appointments())
         
-        # Extract data
-        appointments_data = result.data
+        if include_archived:
+            # Rows being archived right now can be in both places; the table's copy wins
+            hot_ids = {row['id'] for row in appointments_data}
+            appointments_data += [row for row in archive.read_rows() if row['id'] not in hot_ids]
         
-        # Convert to pandas DataFrame
-        df = pd.DataFrame(appointments_data)
+        # Build the DataFrame column by column with compact dtypes
+        df = appointments_frame(appointments_data)
         
         return True, df
     except Exception as e:
         return False, str(e)
 
+def get_upcoming_appointments(days=None, columns='*'):
+    """Retrieve appointments from today onwards, optionally limited to the next `days` days."""
+    try:
+        today = datetime.now().date()
+        rows = []
+        start = 0
+        while True:
+            query = get_appointments_table().select(columns).gte('appointment_date', today.isoformat())
+            if days is not None:
+                query = query.lte('appointment_date', (today + timedelta(days=days)).isoformat())
+            result = query.order('id').range(start, start + PAGE_SIZE - 1).execute()
+            rows.extend(result.data)
+            if len(result.data) < PAGE_SIZE:
+                break
+            start += PAGE_SIZE
+        return True, rows
+    except Exception as e:
+        return False, str(e)
+
+# Shown when the database predates the idempotency column
+IDEMPOTENCY_COLUMN_MISSING = (
+    "The appointments table has no idempotency_key column; add it with: "
+    "alter table appointments add column idempotency_key text unique;"
+)
+
+def is_missing_idempotency_column(error):
+    """Return True if a PostgREST error says the idempotency_key column doesn't exist."""
+    message = str(error)
+    return "idempotency_key" in message and ("PGRST204" in message or "42703" in message or "column" in message)
+
+def check_idempotency_column():
+    """Raise an exception explaining the fix if the appointments table has no idempotency_key column."""
+    try:
+        get_appointments_table().select('idempotency_key').limit(1).execute()
+    except Exception as e:
+        if is_missing_idempotency_column(e):
+            raise Exception(IDEMPOTENCY_COLUMN_MISSING) from e
+        raise
+    return "idempotency_key column present"
+
+def get_appointment_id_by_idempotency_key(idempotency_key):
+    """Return the ID of the appointment created with an idempotency key, or None."""
+    try:
+        result = get_appointments_table().select('id').eq('idempotency_key', idempotency_key).limit(1).execute()
+        return result.data[0]['id'] if result.data else None
+    except Exception as e:
+        print(f"Error looking up idempotency key: {e}")
+        return None
+
+def get_appointment_file_urls(appointment_id):
+    """Return the stored file URL columns of an appointment, read from the table rather than the cache."""
+    try:
+        result = get_appointments_table().select('file_url,thirst_trap_url').eq('id', appointment_id).execute()
+        return result.data[0] if result.data else {}
+    except Exception as e:
+        print(f"Error reading file URLs of appointment {appointment_id}: {e}")
+        return {}
+
 def get_appointment_by_id(appointment_id):
-    """Retrieve a specific appointment by ID."""
+    """Retrieve a specific appointment by ID as an Appointment."""
+    cached = _appointment_cache.get(appointment_id)
+    if cached is not None:
+        return True, cached
+    
     try:
+        # Taken before the query, so a row updated while it is in flight isn't cached stale
+        generation = _appointment_cache.generation()
+        
         # Query the appointment by ID
         result = get_appointments_table().select('*').eq('id', appointment_id).execute()
         
-        # Check if appointment was found
-        if not result.data:
+        # Fall back to the archive for appointments no longer in the table
+        if result.data:
+            appointment = from_row(result.data[0])
+        else:
+            appointment = archive.get_archived_appointment(appointment_id)
+        if appointment is None:
             return False, "Appointment not found"
         
-        # Return the first match
-        return True, result.data[0]
+        # Appointments are immutable, so the cached one can be shared
+        _appointment_cache.put(appointment_id, appointment, generation)
+        return True, appointment
     except Exception as e:
         return False, str(e)
 
+def invalidate_appointment(event, row):
+    """Drop an updated appointment from the read-through cache."""
+    if event == 'update' and row.get('id') is not None:
+        _appointment_cache.invalidate(row['id'])
+
+def get_appointment_cache_stats():
+    """Return hit-ratio metrics of the appointment cache."""
+    return _appointment_cache.stats()
+
 def update_appointment_status(appointment_id, new_status):
     """Update the status of an appointment."""
     try:
@@ -150,10 +299,129 @@ def update_appointment_status(appointment_id, new_status):
         if not result.data:
             return False, "Appointment not found"
         
+        for row in result.data:
+            notify_change('update', row)
+        
         return True, "Status updated successfully"
     except Exception as e:
         return False, str(e)
 
+# Columns loaded into the search index: the searchable fields plus what the results table shows
+SEARCH_COLUMNS = ','.join(('id',) + SEARCH_FIELDS + ('appointment_type', 'appointment_date', 'appointment_time', 'status'))
+
+# Rebuild the search index after this many seconds, to pick up writes made by
+# other processes when state isn't shared between them
+SEARCH_INDEX_MAX_AGE_SECONDS = int(os.getenv("SEARCH_INDEX_MAX_AGE_SECONDS", "600"))
+
+_search_index = None
+_search_index_built_at = None
+_search_index_lock = threading.Lock()
+_search_changes_lock = threading.Lock()
+_pending_search_changes = None  # rows changed while the index is being seeded, replayed afterwards
+
+def _apply_search_change(event, row):
+    """Keep the search index current, and remember changes that arrive while it is being (re)built."""
+    with _search_changes_lock:
+        if _pending_search_changes is not None:
+            _pending_search_changes.append(row)
+        index = _search_index
+    if index is not None:
+        index.add(row)
+
+def _seed_search_index():
+    """Build a new search index from the archive and a paged query in id order."""
+    index = AppointmentIndex()
+    index.add_many(archive.read_rows(SEARCH_COLUMNS.split(',')))
+    start = 0
+    while True:
+        result = get_appointments_table().select(SEARCH_COLUMNS).order('id').range(start, start + PAGE_SIZE - 1).execute()
+        index.add_many(result.data)
+        if len(result.data) < PAGE_SIZE:
+            return index
+        start += PAGE_SIZE
+
+def _get_search_index():
+    """Build the search index on first use and rebuild it once it is too old; change events keep it current in between."""
+    global _search_index, _search_index_built_at, _pending_search_changes
+    with _search_index_lock:
+        if _search_index_built_at is None or time.monotonic() - _search_index_built_at > SEARCH_INDEX_MAX_AGE_SECONDS:
+            # Changes made while seeding might be missed by the seed query, so they are replayed on top
+            with _search_changes_lock:
+                _pending_search_changes = []
+            try:
+                index = _seed_search_index()
+            except Exception:
+                with _search_changes_lock:
+                    _pending_search_changes = None
+                raise
+            # Replay and swap in one step, so no change lands between them
+            with _search_changes_lock:
+                index.add_many(_pending_search_changes)
+                _pending_search_changes = None
+                _search_index = index
+            _search_index_built_at = time.monotonic()
+    return _search_index
+
+add_change_listener(_apply_search_change, remote=True)
+
+def warm_search_index():
+    """Build the search index now instead of on the first search; return the number of indexed appointments."""
+    return len(_get_search_index())
+
+def search_appointments(query, page=1, page_size=20):
+    """Search appointments by name, email, phone, reason or notes with prefix and fuzzy matching."""
+    try:
+        total, rows = _get_search_index().search(query, page=page, page_size=page_size)
+        return True, (total, appointments_frame(rows))
+    except Exception as e:
+        return False, str(e)
+
+# IDs per bulk update request, kept small enough for the filter to fit in the request URL
+BULK_CHUNK_SIZE = 200
+
+def update_appointments_status(appointment_ids, new_status, chunk_size=BULK_CHUNK_SIZE):
+    """
+    Update the status of many appointments with chunked `in` filters.
+    
+    Args:
+        appointment_ids: IDs of the appointments to update
+        new_status: Status to set on every appointment
+        chunk_size: Number of IDs sent per request
+        
+    Returns:
+        tuple: (success, dict mapping each ID to "updated", "not found" or an error message)
+    """
+    outcomes = {}
+    updated_rows = []
+    ids = list(dict.fromkeys(appointment_ids))
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start:start + chunk_size]
+        try:
+            result = get_appointments_table().update({"status": new_status}).in_('id', chunk).execute()
+        except Exception as e:
+            for appointment_id in chunk:
+                outcomes[appointment_id] = str(e)
+            continue
+        
+        updated = {row['id'] for row in result.data}
+        updated_rows.extend(result.data)
+        for appointment_id in chunk:
+            outcomes[appointment_id] = "updated" if appointment_id in updated else "not found"
+    
+    # One shared state message for the whole update, not one per row
+    notify_changes('update', updated_rows)
+    
+    success = all(outcome == "updated" for outcome in outcomes.values())
+    return success, outcomes
+
+add_change_listener(invalidate_appointment, remote=True)
+
 def check_database_connection():
-    """Test the Supabase connection and return the result."""
-    return test_connection() 
\ No newline at end of file
+    """Test the Supabase connection and return the result, reusing a recent result from any process."""
+    store = shared_state.get_store()
+    cached = store.get("health:database")
+    if cached is not None:
+        return tuple(cached)
+    result = test_connection()
+    store.set("health:database", list(result), ttl=HEALTH_CHECK_TTL_SECONDS)
+    return result
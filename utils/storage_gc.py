@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Orphaned Upload Garbage Collector
+
+Deletes storage objects that no appointment points to, such as files left
+behind when an upload succeeded but the database write after it failed, or
+test files from test_supabase.py. Objects younger than the grace period are
+kept, so uploads whose appointment is still being saved are never touched.
+
+Run from the repository root (dry run by default):
+    python -m utils.storage_gc [--delete] [--grace-hours HOURS]
+"""
+
+import argparse
+import os
+from datetime import datetime, timedelta, timezone
+from urllib.parse import unquote, urlsplit
+from dotenv import load_dotenv
+from utils import async_db, archive
+from utils.db_connection import supabase
+
+# Load environment variables
+load_dotenv()
+
+# Buckets written by app.py and by the legacy utils/storage.save_appointment path
+GC_BUCKETS = tuple(dict.fromkeys([
+    "appointment-files",
+    "thirst-traps",
+    os.getenv("UPLOAD_BUCKET", "uploads"),
+    os.getenv("THIRST_TRAP_BUCKET", "thirst_traps")
+]))
+
+GC_GRACE_HOURS = float(os.getenv("GC_GRACE_HOURS", "24"))
+LIST_PAGE_SIZE = 1000
+REMOVE_BATCH_SIZE = 100
+REFERENCE_PAGE_SIZE = 1000
+
+# Only the URL columns are fetched when building the reference index. Rows
+# saved by the legacy utils/storage.save_appointment path keep their
+# UPLOAD_BUCKET/THIRST_TRAP_BUCKET URLs under the old column names.
+URL_COLUMNS = ("file_url", "thirst_trap_url")
+LEGACY_URL_COLUMNS = ("file_path", "thirst_trap_path")
+
+def object_key(url):
+    """Return (bucket, path) for a Supabase public object URL, or None for other URLs."""
+    if not url:
+        return None
+    marker = "/storage/v1/object/public/"
+    path = urlsplit(url).path
+    if marker not in path:
+        return None
+    bucket, _, name = path.split(marker, 1)[1].partition("/")
+    return bucket, unquote(name)
+
+async def _select_references():
+    """Fetch the URL columns, current and legacy, of every appointment with a keyset scan on id."""
+    # Selecting a column the table doesn't have is an error, so look at which ones exist first
+    sample = await async_db.select_rows("appointments", "*", start=0, end=0)
+    if not sample:
+        return [], ()
+    columns = tuple(column for column in URL_COLUMNS + LEGACY_URL_COLUMNS if column in sample[0])
+    if not columns:
+        return [], ()
+    rows = await async_db.select_all_rows("appointments", ",".join(columns), page_size=REFERENCE_PAGE_SIZE)
+    return rows, columns
+
+def referenced_objects():
+    """Return the set of (bucket, path) pairs referenced by any appointment, archived ones included."""
+    referenced = set()
+    rows, columns = async_db.run(_select_references())
+    # Archived rows have the current columns, plus the legacy ones they were archived with
+    rows += archive.read_rows(list(URL_COLUMNS + LEGACY_URL_COLUMNS))
+    columns = set(columns).union(URL_COLUMNS, LEGACY_URL_COLUMNS)
+    for row in rows:
+        for column in columns:
+            key = object_key(row.get(column))
+            if key is not None:
+                referenced.add(key)
+    return referenced
+
+def _created_at(item):
+    """Parse an object's creation time; None if the listing has no timestamp."""
+    value = item.get("created_at")
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+def list_objects(bucket, prefix=""):
+    """Yield every object in a bucket page by page, descending into folders."""
+    offset = 0
+    while True:
+        page = supabase.storage.from_(bucket).list(
+            prefix, {"limit": LIST_PAGE_SIZE, "offset": offset, "sortBy": {"column": "name", "order": "asc"}}
+        )
+        for item in page:
+            path = f"{prefix}/{item['name']}" if prefix else item["name"]
+            if item.get("id") is None:
+                # Folders are listed without an ID
+                yield from list_objects(bucket, path)
+            else:
+                yield path, item
+        if len(page) < LIST_PAGE_SIZE:
+            return
+        offset += LIST_PAGE_SIZE
+
+def collect_garbage(delete=False, grace_hours=GC_GRACE_HOURS, buckets=GC_BUCKETS):
+    """
+    Find, and optionally delete, objects no appointment refers to.
+
+    Args:
+        delete: Remove the orphans; when False only report them
+        grace_hours: Objects younger than this are never treated as orphans
+        buckets: Buckets to scan
+
+    Returns:
+        tuple: (success, dict of bucket -> {scanned, orphans, bytes, removed, reclaimed, error}) or (False, error message)
+    """
+    try:
+        # Never delete anything unless the full reference index could be built
+        referenced = referenced_objects()
+    except Exception as e:
+        return False, f"Could not load referenced files: {str(e)}"
+
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=grace_hours)
+    report = {}
+    for bucket in buckets:
+        stats = {"scanned": 0, "orphans": 0, "bytes": 0, "removed": 0, "reclaimed": 0, "error": None}
+        report[bucket] = stats
+        try:
+            orphans = []
+            for path, item in list_objects(bucket):
+                stats["scanned"] += 1
+                created_at = _created_at(item)
+                if (bucket, path) in referenced or created_at is None or created_at > cutoff:
+                    continue
+                orphans.append((path, (item.get("metadata") or {}).get("size") or 0))
+            stats["orphans"] = len(orphans)
+            stats["bytes"] = sum(size for _, size in orphans)
+
+            if delete:
+                for i in range(0, len(orphans), REMOVE_BATCH_SIZE):
+                    batch = orphans[i:i + REMOVE_BATCH_SIZE]
+                    supabase.storage.from_(bucket).remove([path for path, _ in batch])
+                    stats["removed"] += len(batch)
+                    stats["reclaimed"] += sum(size for _, size in batch)
+        except Exception as e:
+            stats["error"] = str(e)
+            print(f"Error collecting garbage in bucket {bucket}: {e}")
+    return True, report
+
+def main():
+    """Run the garbage collector from the command line."""
+    parser = argparse.ArgumentParser(description="Delete uploaded files that no appointment refers to.")
+    parser.add_argument("--delete", action="store_true", help="remove orphans instead of only reporting them")
+    parser.add_argument("--grace-hours", type=float, default=GC_GRACE_HOURS, help="minimum age of an orphan")
+    args = parser.parse_args()
+
+    success, report = collect_garbage(delete=args.delete, grace_hours=args.grace_hours)
+    if not success:
+        print(f"❌ {report}")
+        return
+
+    total_bytes = 0
+    for bucket, stats in report.items():
+        total_bytes += stats["reclaimed"] if args.delete else stats["bytes"]
+        if stats["error"]:
+            print(f"❌ {bucket}: {stats['error']}")
+            continue
+        print(f"{bucket}: {stats['scanned']} objects, {stats['orphans']} orphans "
+              f"({stats['bytes'] / 1024 / 1024:.1f} MB), {stats['removed']} removed")
+
+    verb = "Reclaimed" if args.delete else "Would reclaim (dry run)"
+    print(f"\n{verb} {total_bytes / 1024 / 1024:.1f} MB")
+
+if __name__ == "__main__":
+    main()
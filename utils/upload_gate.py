@@ -0,0 +1,109 @@
+# Bytes read from the start of an upload to identify its real type
+SNIFF_BYTES = 4096
+
+# Content type reported for each sniffed kind of file
+CONTENT_TYPES = {
+    'jpeg': "image/jpeg",
+    'png': "image/png",
+    'gif': "image/gif",
+    'pdf': "application/pdf",
+    'mp4': "video/mp4",
+    'zip': "application/zip",
+    'ole': "application/x-ole-storage",
+    'text': "text/plain",
+}
+
+# Kinds of content accepted for each file extension
+EXTENSION_KINDS = {
+    'jpg': {'jpeg'},
+    'jpeg': {'jpeg'},
+    'png': {'png'},
+    'gif': {'gif'},
+    'pdf': {'pdf'},
+    'mp4': {'mp4'},
+    # Office Open XML files are zip archives, legacy Office files are OLE2 compound files
+    'docx': {'zip'},
+    'xlsx': {'zip'},
+    'pptx': {'zip'},
+    'doc': {'ole'},
+    'xls': {'ole'},
+    'ppt': {'ole'},
+    'csv': {'text'},
+    'txt': {'text'},
+    'md': {'text'},
+}
+
+# Content types for Office formats, which can't be told apart from the first bytes alone
+OFFICE_CONTENT_TYPES = {
+    'docx': "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    'xlsx': "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    'pptx': "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+    'doc': "application/msword",
+    'xls': "application/vnd.ms-excel",
+    'ppt': "application/vnd.ms-powerpoint",
+    'csv': "text/csv",
+    'md': "text/markdown",
+}
+
+# Byte order marks of UTF-8, UTF-32 and UTF-16 text (UTF-32 LE before UTF-16 LE, which it starts with)
+TEXT_BOMS = (b"\xef\xbb\xbf", b"\xff\xfe\x00\x00", b"\x00\x00\xfe\xff", b"\xff\xfe", b"\xfe\xff")
+# Control bytes that don't occur in text in any single-byte encoding or UTF-8: everything below
+# 0x20 except tab, line feed, form feed, carriage return, ^Z (old DOS end of file) and escape
+TEXT_CONTROL_BYTES = bytes(byte for byte in range(0x20) if byte not in b"\t\n\x0c\r\x1a\x1b") + b"\x7f"
+
+def sniff(head):
+    """Identify the kind of a file from its first bytes, or return None if unknown."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return 'jpeg'
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return 'png'
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return 'gif'
+    if head.startswith(b"%PDF-"):
+        return 'pdf'
+    if head[4:8] == b"ftyp":
+        return 'mp4'
+    if head.startswith(b"PK\x03\x04"):
+        return 'zip'
+    if head.startswith(b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"):
+        return 'ole'
+    # Any encoding is fine (UTF-8, Latin-1/cp1252 as Excel saves CSV, UTF-16 with a BOM), binary control bytes are not
+    if head.startswith(TEXT_BOMS) or len(head.translate(None, TEXT_CONTROL_BYTES)) == len(head):
+        return 'text'
+    return None
+
+def _extension(file_name):
+    return file_name.rsplit(".", 1)[-1].lower() if "." in file_name else ""
+
+def check_upload(file_object, allowed_extensions, max_bytes):
+    """
+    Check an uploaded file's size and real type before it is previewed or read in full.
+
+    The size comes from the upload's metadata and only the first SNIFF_BYTES
+    are read, so oversized or mislabeled files are rejected without copying
+    their content.
+
+    Args:
+        file_object: Streamlit UploadedFile
+        allowed_extensions: Extensions accepted by the uploader
+        max_bytes: Maximum file size in bytes
+
+    Returns:
+        tuple: (is_valid, error message or "", content type to store the file with)
+    """
+    if file_object.size > max_bytes:
+        return False, f"{file_object.name} exceeds the maximum size of {max_bytes / (1024 * 1024):.0f}MB.", None
+
+    extension = _extension(file_object.name)
+    if extension not in allowed_extensions or extension not in EXTENSION_KINDS:
+        return False, f"{file_object.name} is not an accepted file type.", None
+
+    position = file_object.tell()
+    file_object.seek(0)
+    head = file_object.read(SNIFF_BYTES)
+    file_object.seek(position)
+
+    kind = sniff(head)
+    if kind not in EXTENSION_KINDS[extension]:
+        return False, f"The content of {file_object.name} doesn't match its .{extension} extension.", None
+    return True, "", OFFICE_CONTENT_TYPES.get(extension, CONTENT_TYPES[kind])
@@ -0,0 +1,108 @@
+import os
+import threading
+import time
+from dotenv import load_dotenv
+from utils import async_db, storage, analytics, archive
+from utils.db_connection import supabase
+
+# Load environment variables
+load_dotenv()
+
+# Buckets the booking form uploads to
+REQUIRED_BUCKETS = ("appointment-files", "thirst-traps")
+# Wait before warming up again after a failed step
+WARMUP_RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", "30"))
+
+_lock = threading.Lock()
+_started = False
+_ready = False
+_steps = {}  # step name -> {"ok", "ms", "detail"}
+_total_ms = None
+
+def _open_connections():
+    """Open the pooled HTTP connection and the Supabase client's connection."""
+    async_db.run(async_db.select_rows("appointments", "id", start=0, end=0))
+    success, message = storage.check_database_connection()
+    if not success:
+        raise Exception(message)
+    return "connected"
+
+def _verify_buckets():
+    """Check once that the upload buckets exist."""
+    names = {bucket['name'] if isinstance(bucket, dict) else bucket.name for bucket in supabase.storage.list_buckets()}
+    missing = [bucket for bucket in REQUIRED_BUCKETS if bucket not in names]
+    if missing:
+        raise Exception(f"Missing storage buckets: {', '.join(missing)}")
+    return f"{len(REQUIRED_BUCKETS)} buckets"
+
+def _check_schema():
+    """Check that the appointments table has the columns bookings are saved with."""
+    return storage.check_idempotency_column()
+
+def _check_archive():
+    """Check that the archive directory is writable when archiving is on."""
+    return archive.check_archive_dir()
+
+def _prime_admin():
+    """Build the statistics rollup and search index shown on the first admin page."""
+    analytics.load_rollup()
+    return f"{storage.warm_search_index()} appointments indexed"
+
+# Warm-up steps, in the order they run
+STEPS = (
+    ("connections", _open_connections),
+    ("buckets", _verify_buckets),
+    ("schema", _check_schema),
+    ("archive", _check_archive),
+    ("admin", _prime_admin),
+)
+
+def run_warmup():
+    """Run every warm-up step, recording its duration; return True if all of them succeeded."""
+    global _ready, _total_ms
+    started = time.perf_counter()
+    all_ok = True
+    for name, step in STEPS:
+        step_started = time.perf_counter()
+        try:
+            detail = step()
+            ok = True
+        except Exception as e:
+            detail = str(e)
+            ok = False
+            all_ok = False
+            print(f"Warm-up step {name} failed: {e}")
+        with _lock:
+            _steps[name] = {"ok": ok, "ms": round((time.perf_counter() - step_started) * 1000, 1), "detail": detail}
+    with _lock:
+        _total_ms = round((time.perf_counter() - started) * 1000, 1)
+        _ready = all_ok
+    return all_ok
+
+def _warm_up_until_ready():
+    while not run_warmup():
+        time.sleep(WARMUP_RETRY_SECONDS)
+    print(f"Warm-up finished in {_total_ms} ms")
+
+def start():
+    """Start warming up on a background thread, once per process."""
+    global _started
+    with _lock:
+        if _started:
+            return
+        _started = True
+    threading.Thread(target=_warm_up_until_ready, name="warmup", daemon=True).start()
+
+def is_ready():
+    """Return True once every warm-up step has succeeded."""
+    return _ready
+
+def status():
+    """Return readiness and the timing breakdown of the latest warm-up."""
+    with _lock:
+        return {
+            "ready": _ready,
+            "started": _started,
+            "total_ms": _total_ms,
+            "steps": {name: dict(step) for name, step in _steps.items()}
+        }